@@ -468,6 +468,25 @@ def get_processing_steps(url, token, sample_ids, process_type="baseclasses.BaseP
     data.sort(key=lambda process : process["positon_in_experimental_plan"])
     return data
 
+def get_process_history(url, token, batch_ids, batch_type="fairmat_Batch"):
+    # the batch parser stores the ordered processing steps of all samples on the batch,
+    # so one archive read per batch is enough
+    query = {
+        'required': {
+            'data': {'lab_id': '*', 'process_history': '*'},
+        },
+        'owner': 'visible',
+        'query': {'results.eln.lab_ids:any': batch_ids, 'entry_type': batch_type},
+        'pagination': {
+            'page_size': 10000
+        }
+    }
+    response = requests.post(f'{url}/entries/archive/query',
+                             headers={'Authorization': f'Bearer {token}'}, json=query)
+    response.raise_for_status()
+    return {entry["archive"]["data"].get("lab_id"): entry["archive"]["data"].get("process_history", [])
+            for entry in response.json()["data"]}
+
 def get_efficiencies(url, token, sample_ids):
     query = {
         "required": {"results":{"properties":{"optoelectronic":{"solar_cell":{"efficiency":"*"}}}, "eln":{"lab_ids":"*"}}},
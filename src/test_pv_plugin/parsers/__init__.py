@@ -12,6 +12,28 @@ class NewParserEntryPoint(ParserEntryPoint):
 
 
 class fairmatExperimentParserEntryPoint(ParserEntryPoint):
+    frame_cache_size_mb: int = Field(
+        256, description='Memory limit of the cache for decoded experiment workbooks.'
+    )
+    archive_writer_workers: int = Field(
+        1, description='Number of threads writing the child archives of a batch.'
+    )
+    incremental: bool = Field(
+        False,
+        description='Skip rewriting child archives whose content did not change since '
+        'the last parse of the same experiment file. The content hashes are kept in '
+        'a `<experiment file>.manifest.json` file in the upload.',
+    )
+    streaming: bool = Field(
+        False,
+        description='Read experiment files row by row and write child archives as '
+        'they are mapped, for sheets too large to hold in memory.',
+    )
+    store_parse_timings: bool = Field(
+        False,
+        description='Store the time spent in every parse stage in the archive of the '
+        'experiment file.',
+    )
 
     def load(self):
         from test_pv_plugin.parsers.fairmat_batch_parser import fairmatExperimentParser
@@ -27,6 +49,16 @@ class fairmatParserEntryPoint(ParserEntryPoint):
         return fairmatParser(**self.model_dump())
 
 
+class fairmatBundleParserEntryPoint(ParserEntryPoint):
+
+    def load(self):
+        from test_pv_plugin.parsers.fairmat_measurement_parser import (
+            fairmatBundleParser,
+        )
+
+        return fairmatBundleParser(**self.model_dump())
+
+
 parser_entry_point = NewParserEntryPoint(
     name='NewParser',
     description='New parser entry point configuration.',
@@ -37,7 +69,7 @@ parser_entry_point = NewParserEntryPoint(
 fairmat_experiment_parser_entry_point = fairmatExperimentParserEntryPoint(
     name='fairmatExperimentParserEntryPoint',
     description='fairmat experiment parser entry point configuration.',
-    mainfile_name_re='^(.+\.xlsx)$',
+    mainfile_name_re=r'^(.+\.(xlsx|csv|tsv|parquet))$',
     mainfile_mime_re='(application|text|image)/.*',
 )
 
@@ -48,3 +80,11 @@ fairmat_parser_entry_point = fairmatParserEntryPoint(
     mainfile_name_re='^.+\.?.+\.((eqe|jv|mppt)\..{1,4})$',
     mainfile_mime_re='(application|text|image)/.*',
 )
+
+
+fairmat_bundle_parser_entry_point = fairmatBundleParserEntryPoint(
+    name='fairmatBundleParserEntryPoint',
+    description='fairmat parser for bundles of measurement files.',
+    mainfile_name_re=r'^.+\.measurements\.json$',
+    mainfile_mime_re='(application|text)/.*',
+)
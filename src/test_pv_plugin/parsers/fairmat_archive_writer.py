@@ -0,0 +1,148 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import hashlib
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from baseclasses.helper.utilities import create_archive
+
+"""
+Writer stage for the child archives created by the parsers.
+"""
+
+
+def archive_hash(entity):
+    """Returns the SHA-256 hash of the serialized `entity`."""
+    content = json.dumps(
+        entity.m_to_dict(with_root_def=True), sort_keys=True, default=str
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def load_manifest(archive, path):
+    """
+    Loads the manifest mapping child archive file names to their content hash,
+    returns an empty manifest if there is none or it cannot be read.
+    """
+    try:
+        if not archive.m_context.raw_path_exists(path):
+            return {}
+        with archive.m_context.raw_file(path, 'r') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_manifest(archive, path, manifest):
+    with archive.m_context.raw_file(path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+class ChildArchiveWriter:
+    """
+    Writes child archives of a parse through `write(entity, file_name)`, which
+    defaults to `create_archive` on the given archive.
+
+    With `max_workers > 1` the writes run in a thread pool, with at most
+    `max_pending` writes in flight. Failing writes are logged and reported in
+    `failed`, they do not abort the remaining writes. `written` lists the
+    successfully written file names in submission order.
+
+    If a `previous_manifest` is given, the content hash of every written child
+    is recorded in `manifest` and children whose hash and file are unchanged are
+    not written again. They are listed in `written` and `skipped`.
+    """
+
+    def __init__(
+        self,
+        archive,
+        logger,
+        max_workers=1,
+        max_pending=None,
+        write=None,
+        previous_manifest=None,
+    ):
+        self.archive = archive
+        self.logger = logger
+        self.write = write or self._create_archive
+        self.previous_manifest = previous_manifest
+        self.manifest = {}
+        self.skipped = []
+        self.max_pending = max_pending or 2 * max_workers
+        self._executor = ThreadPoolExecutor(max_workers) if max_workers > 1 else None
+        self._pending = deque()
+        self.written = []
+        self.failed = []
+
+    def _create_archive(self, entity, file_name):
+        create_archive(entity, self.archive, file_name)
+
+    def _write_changed(self, entity, file_name):
+        content_hash = archive_hash(entity)
+        if self.previous_manifest.get(
+            file_name
+        ) == content_hash and self.archive.m_context.raw_path_exists(file_name):
+            self.skipped.append(file_name)
+        else:
+            self.write(entity, file_name)
+        # only after a successful write, a failed one is retried on the next parse
+        self.manifest[file_name] = content_hash
+
+    def _collect(self, file_name, future):
+        try:
+            future.result()
+        except Exception as e:
+            self._fail(file_name, e)
+            return
+        self.written.append(file_name)
+
+    def _fail(self, file_name, e):
+        self.logger.error(
+            'could not write child archive', file_name=file_name, exc_info=e
+        )
+        self.failed.append(file_name)
+
+    def submit(self, entity, file_name):
+        write = self.write if self.previous_manifest is None else self._write_changed
+        if self._executor is None:
+            try:
+                write(entity, file_name)
+            except Exception as e:
+                self._fail(file_name, e)
+                return
+            self.written.append(file_name)
+            return
+
+        while len(self._pending) >= self.max_pending:
+            self._collect(*self._pending.popleft())
+        self._pending.append((file_name, self._executor.submit(write, entity, file_name)))
+
+    def close(self):
+        while self._pending:
+            self._collect(*self._pending.popleft())
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,153 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import numpy as np
+import pandas as pd
+
+"""
+Helpers to group the rows of an experiment sheet by identical process settings.
+"""
+
+
+def normalize_value(value):
+    """Normalizes missing values (NaN, None, NaT) to `None`."""
+    return None if pd.isna(value) else value
+
+
+class ProcessRowGroups:
+    """
+    Incrementally groups rows of a process column group by identical settings,
+    keeping only the first row of every group in memory.
+    """
+
+    def __init__(self):
+        self._groups = {}
+
+    def add(self, j, values, lab_id):
+        key = tuple(normalize_value(v) for v in values)
+        group = self._groups.get(key)
+        if group is None:
+            self._groups[key] = (j, values, [lab_id])
+        else:
+            group[2].append(lab_id)
+
+    def __iter__(self):
+        """Yields `(j, values, lab_ids)` like `ExperimentIndex.group_rows`."""
+        for key, group in self._groups.items():
+            if all(v is None for v in key):
+                continue
+            yield group
+
+
+class BlockCodes:
+    """
+    Integer codes of the rows of a column block. Rows with identical values share
+    a code, codes are numbered in order of first occurrence. `first[c]` is the
+    position of the first row with code `c`, `members[c]` the positions of all
+    rows with code `c` and `empty[c]` tells if these rows have no value at all.
+    """
+
+    def __init__(self, codes, first, members, empty):
+        self.codes = codes
+        self.first = first
+        self.members = members
+        self.empty = empty
+
+
+def encode_columns(columns, n_rows) -> BlockCodes:
+    """
+    Encodes the `n_rows` rows formed by `columns`, a list of Series, into integer
+    codes. Missing values compare equal.
+    """
+    column_codes = np.full((n_rows, max(len(columns), 1)), -1, dtype=np.int64)
+    for c, column in enumerate(columns):
+        column_codes[:, c] = pd.factorize(column, use_na_sentinel=True)[0]
+
+    _, first, inverse = np.unique(
+        column_codes, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    # renumber the codes in order of first occurrence
+    order = np.argsort(first, kind='stable')
+    renumber = np.empty_like(order)
+    renumber[order] = np.arange(len(order))
+    codes = renumber[inverse]
+    first = first[order]
+
+    sorted_positions = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes, minlength=len(first))
+    members = np.split(sorted_positions, np.cumsum(counts)[:-1])
+    empty = (column_codes[first] == -1).all(axis=1)
+    return BlockCodes(codes, first, members, empty)
+
+
+class ExperimentIndex:
+    """
+    Integer coded representation of an experiment sheet, built once per parse.
+    Rows of every column group are encoded on first use, without copying the
+    group out of the frame.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.positions = {}
+        for position, (group, column) in enumerate(df.columns):
+            self.positions.setdefault(group, {})[column] = position
+        self._codes = {}
+
+    def encode(self, group, columns=None) -> BlockCodes:
+        """Returns the codes of `columns` of `group`, all columns by default."""
+        key = (group, None if columns is None else tuple(columns))
+        if key not in self._codes:
+            positions = self._column_positions(group, columns)
+            self._codes[key] = encode_columns(
+                [self.df.iloc[:, p] for p in positions], len(self.df))
+        return self._codes[key]
+
+    def _column_positions(self, group, columns=None):
+        if columns is None:
+            return list(self.positions[group].values())
+        return [self.positions[group][c] for c in columns]
+
+    def rows(self, group, positions, columns=None):
+        """Returns the rows at `positions` of `group` as a data frame."""
+        block = self.df.iloc[positions, self._column_positions(group, columns)]
+        return block.droplevel(0, axis=1)
+
+    def row(self, group, position, columns=None):
+        row = self.df.iloc[position, self._column_positions(group, columns)]
+        return row.droplevel(0)
+
+    def group_rows(self, group, lab_ids: pd.Series):
+        """
+        Groups the rows of `group` by identical settings. Returns a list of
+        `(j, row, lab_ids)` triples in order of first occurrence, where `j` is
+        the index of the first row with these settings, `row` the row itself and
+        `lab_ids` the `Nomad ID`s of all samples sharing the settings. Rows
+        without any value are skipped.
+        """
+        codes = self.encode(group)
+        lab_id_values = lab_ids.to_numpy(dtype=object)
+        return [
+            (
+                self.df.index[first],
+                self.row(group, first),
+                lab_id_values[members].tolist(),
+            )
+            for first, members, empty in zip(codes.first, codes.members, codes.empty)
+            if not empty
+        ]
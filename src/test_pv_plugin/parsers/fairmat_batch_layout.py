@@ -0,0 +1,75 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from collections import namedtuple
+from functools import lru_cache
+
+"""
+Layout plans for experiment sheets.
+
+A plan is compiled once per header signature, i.e. the column index of a sheet,
+and assigns every process column group the mappers that create its archives.
+Sheets created from the same template share the plan.
+"""
+
+ProcessMapper = namedtuple(
+    'ProcessMapper',
+    ['keyword', 'map', 'requires_material', 'typed_parameters'],
+    defaults=[False],
+)
+
+ProcessStep = namedtuple(
+    'ProcessStep',
+    ['index', 'group', 'columns', 'mappers', 'material_mappers', 'typed_parameters'],
+)
+
+
+@lru_cache(maxsize=64)
+def compile_layout_plan(header, process_mappers, info_group='Experiment Info'):
+    """
+    Compiles the layout plan for the column keys `header`, a tuple of
+    `(group, column)` tuples.
+
+    `process_mappers` is a tuple of `ProcessMapper`, a group is handled by every
+    mapper whose keyword is part of the group name. Mappers that require a
+    material are listed in `material_mappers` and only apply to rows with a
+    `Material name`. Mappers with `typed_parameters` get the typed process
+    parameters of the row, `typed_parameters` of a step tells whether they have
+    to be computed. Returns a tuple of `ProcessStep`, where `index` is the
+    position of the group among all groups of the sheet.
+    """
+    groups = {}
+    for group, column in header:
+        groups.setdefault(group, []).append(column)
+
+    plan = []
+    for index, (group, columns) in enumerate(groups.items()):
+        if group == info_group:
+            continue
+        matching = [m for m in process_mappers if m.keyword in group]
+        plan.append(
+            ProcessStep(
+                index=index,
+                group=group,
+                columns=tuple(columns),
+                mappers=tuple(m.map for m in matching if not m.requires_material),
+                material_mappers=tuple(m.map for m in matching if m.requires_material),
+                typed_parameters=any(m.typed_parameters for m in matching),
+            )
+        )
+    return tuple(plan)
@@ -16,6 +16,10 @@
 # limitations under the License.
 #
 
+import re
+from collections import Counter
+
+import numpy as np
 import pandas as pd
 from baseclasses.helper.solar_cell_batch_mapping import (
     get_reference,
@@ -32,13 +36,38 @@ from baseclasses.helper.solar_cell_batch_mapping import (
     map_sputtering,
     map_substrate,
 )
-from baseclasses.helper.utilities import create_archive
+from nomad.config import config
 from nomad.datamodel import EntryArchive
-from nomad.datamodel.data import EntryData
+from nomad.datamodel.data import ArchiveSection, EntryData
 from nomad.datamodel.metainfo.basesections import Entity
-from nomad.metainfo import Quantity
+from nomad.metainfo import Quantity, Section, SubSection
 from nomad.parsing import MatchingParser
 
+from test_pv_plugin.parsers.fairmat_archive_writer import (
+    ChildArchiveWriter,
+    load_manifest,
+    save_manifest,
+)
+from test_pv_plugin.parsers.fairmat_batch_grouping import (
+    ExperimentIndex,
+    ProcessRowGroups,
+    normalize_value,
+)
+from test_pv_plugin.parsers.fairmat_batch_layout import (
+    ProcessMapper,
+    compile_layout_plan,
+)
+from test_pv_plugin.parsers.fairmat_parse_timings import StageTimings
+from test_pv_plugin.parsers.fairmat_experiment_reader import (
+    frame_cache,
+    experiment_sheets,
+    file_key,
+    is_experiment_file,
+    iter_xlsx_rows,
+    read_experiment_frame,
+    read_xlsx_header,
+)
+
 from test_pv_plugin.schema_packages.fairmat_package import (
     fairmat_Batch,
     fairmat_Cleaning,
@@ -52,6 +81,7 @@ from test_pv_plugin.schema_packages.fairmat_package import (
     fairmat_Sputtering,
     fairmat_Substrate,
     fairmat_AtomicLayerDeposition,
+    ProcessHistoryStep,
     ProcessParameter,
 )
 
@@ -60,24 +90,165 @@ from test_pv_plugin.schema_packages.fairmat_package import (
 This is a hello world style example for an example parser/converter.
 """
 
+configuration = config.get_plugin_entry_point(
+    'test_pv_plugin.parsers:fairmat_experiment_parser_entry_point'
+)
+
+SUBSTRATE_COLUMNS = [
+    'Sample dimension',
+    'Sample area [cm^2]',
+    'Pixel area [cm^2]',
+    'Number of pixels',
+    'Notes',
+    'Substrate material',
+    'Substrate conductive layer',
+]
+
+
+class ParseStage(ArchiveSection):
+    m_def = Section(label_quantity='name')
+    name = Quantity(type=str)
+    wall_time = Quantity(type=np.float64, unit='s')
+    cpu_time = Quantity(type=np.float64, unit='s')
+    count = Quantity(type=int)
+
 
 class RawfairmatExperiment(EntryData):
     processed_archive = Quantity(type=Entity, shape=['*'])
+    parse_stages = SubSection(section_def=ParseStage, repeats=True)
 
 
-def map_generic_parameters(process, data):
-    parameters = []
-    for col, val in data.items():
-        if col in ['Notes', 'Name']:
-            continue
-        if pd.isna(val):
+def generic_parameter_lists(block):
+    """
+    Types all cells of a Generic Process block at once. Cells that convert to a
+    number become `value_number`, all other non-empty cells `value_string`.
+    Returns one list of `ProcessParameter` per row of `block`.
+    """
+    block = block.drop(columns=[c for c in ('Notes', 'Name') if c in block.columns])
+    names = list(block.columns)
+    values = block.to_numpy(dtype=object)
+    present = block.notna().to_numpy()
+    numbers = np.full(values.shape, np.nan)
+    for c in range(len(names)):
+        column = block.iloc[:, c]
+        if pd.api.types.is_datetime64_any_dtype(column):
             continue
-        try:
-            val_float = float(val)
-            parameters.append(ProcessParameter(name=col, value_number=val_float))
-        except Exception:
-            parameters.append(ProcessParameter(name=col, value_string=val))
+        numbers[:, c] = pd.to_numeric(column, errors='coerce').to_numpy(dtype=float)
+    is_number = ~np.isnan(numbers)
+
+    return [
+        [
+            ProcessParameter(name=names[c], value_number=numbers[r, c])
+            if is_number[r, c]
+            else ProcessParameter(name=names[c], value_string=values[r, c])
+            for c in np.flatnonzero(present[r])
+        ]
+        for r in range(len(block))
+    ]
+
+
+def process_history_steps(processes, upload_id):
+    """
+    Returns the `(lab_ids, step)` pairs of the process history for the
+    `(name, entity, lab_ids)` triples in `processes`, ordered by the position of
+    the process in the experimental plan. `step` holds the `ProcessHistoryStep`
+    quantities without the lab ids.
+    """
+    steps = []
+    for name, process, lab_ids in processes:
+        layer = getattr(process, 'layer', None)
+        steps.append(
+            (
+                lab_ids,
+                dict(
+                    process=get_reference(upload_id, f'{name}.archive.json'),
+                    process_type=type(process).__name__,
+                    position=process.positon_in_experimental_plan,
+                    name=process.name,
+                    layer_type=layer[0].layer_type if layer else None,
+                    layer_material=layer[0].layer_material_name if layer else None,
+                ),
+            )
+        )
+    steps.sort(key=lambda step: step[1]['position'])
+    return steps
+
+
+def add_process_history(batch, samples, steps):
+    """
+    Adds the process history `steps` of `process_history_steps` to the batch and
+    to every sample among `samples` that went through the step.
+    """
+    batch.process_history = [
+        ProcessHistoryStep(lab_ids=list(lab_ids), **step) for lab_ids, step in steps
+    ]
+    samples_by_id = {sample.lab_id: sample for sample in samples}
+    histories = {lab_id: [] for lab_id in samples_by_id}
+    for lab_ids, step in steps:
+        for lab_id in lab_ids:
+            if lab_id in histories:
+                histories[lab_id].append(ProcessHistoryStep(**step))
+    for lab_id, history in histories.items():
+        samples_by_id[lab_id].process_history = history
+
+
+def _map_cleaning(i, j, lab_ids, row, upload_id, group, parameters=None):
+    return map_cleaning(i, j, lab_ids, row, upload_id, fairmat_Cleaning)
+
+
+def _map_laser_scribing(i, j, lab_ids, row, upload_id, group, parameters=None):
+    return map_laser_scribing(i, j, lab_ids, row, upload_id, fairmat_LaserScribing)
+
+
+def _map_generic(i, j, lab_ids, row, upload_id, group, parameters=None):
+    name, process = map_generic(i, j, lab_ids, row, upload_id, fairmat_Process)
+    if parameters is None:
+        parameters = generic_parameter_lists(row.to_frame().T)[0]
     process.process_parameters = parameters
+    return name, process
+
+
+def _map_evaporation(i, j, lab_ids, row, upload_id, group, parameters=None):
+    coevap = 'Co-Evaporation' in group
+    return map_evaporation(i, j, lab_ids, row, upload_id, fairmat_Evaporation, coevap)
+
+
+def _map_spin_coating(i, j, lab_ids, row, upload_id, group, parameters=None):
+    return map_spin_coating(i, j, lab_ids, row, upload_id, fairmat_SpinCoating)
+
+
+def _map_slot_die_coating(i, j, lab_ids, row, upload_id, group, parameters=None):
+    return map_sdc(i, j, lab_ids, row, upload_id, fairmat_SlotDieCoating)
+
+
+def _map_sputtering(i, j, lab_ids, row, upload_id, group, parameters=None):
+    return map_sputtering(i, j, lab_ids, row, upload_id, fairmat_Sputtering)
+
+
+def _map_inkjet_printing(i, j, lab_ids, row, upload_id, group, parameters=None):
+    return map_inkjet_printing(i, j, lab_ids, row, upload_id, fairmat_Inkjet_Printing)
+
+
+def _map_atomic_layer_deposition(i, j, lab_ids, row, upload_id, group, parameters=None):
+    return map_atomic_layer_deposition(
+        i, j, lab_ids, row, upload_id, fairmat_AtomicLayerDeposition
+    )
+
+
+# mappers are applied in this order, the ones requiring a material only to rows
+# with a material name, the ones with typed parameters get the parameters of all
+# rows of their group typed at once
+PROCESS_MAPPERS = (
+    ProcessMapper('Cleaning', _map_cleaning, False),
+    ProcessMapper('Laser Scribing', _map_laser_scribing, False),
+    ProcessMapper('Generic Process', _map_generic, False, typed_parameters=True),
+    ProcessMapper('Evaporation', _map_evaporation, True),
+    ProcessMapper('Spin Coating', _map_spin_coating, True),
+    ProcessMapper('Slot Die Coating', _map_slot_die_coating, True),
+    ProcessMapper('Sputtering', _map_sputtering, True),
+    ProcessMapper('Inkjet Printing', _map_inkjet_printing, True),
+    ProcessMapper('ALD', _map_atomic_layer_deposition, True),
+)
 
 
 class fairmatExperimentParser(MatchingParser):
@@ -93,114 +264,323 @@ class fairmatExperimentParser(MatchingParser):
             filename, mime, buffer, decoded_buffer, compression)
         if not is_mainfile_super:
             return False
-        try:
-            df = pd.read_excel(filename, header=[0, 1])
-            df['Experiment Info']['Nomad ID'].dropna().to_list()
-        except Exception:
-            return False
-        return True
+        return is_experiment_file(filename)
 
-    def parse(self, mainfile: str, archive: EntryArchive, logger):
-        upload_id = archive.metadata.upload_id
-        # xls = pd.ExcelFile(mainfile)
-        df = pd.read_excel(mainfile, header=[0, 1])
+    def map_process_row(self, step, j, lab_ids, row, upload_id, process_parameters=None):
+        for process_map in step.mappers:
+            yield process_map(
+                step.index, j, lab_ids, row, upload_id, step.group, process_parameters)
+
+        if not step.material_mappers or pd.isna(row.get('Material name')):
+            return
 
+        for process_map in step.material_mappers:
+            yield process_map(step.index, j, lab_ids, row, upload_id, step.group)
+
+    def map_frame(self, df, upload_id, timings=None, name_prefix=''):
+        """
+        Maps an experiment sheet read with `read_experiment_frame`. Returns the
+        `(name, entity)` pairs of all child archives, all names start with
+        `name_prefix`. Time spent per stage is recorded in `timings`, if given.
+        """
+        timings = timings or StageTimings()
         sample_ids = df['Experiment Info']['Nomad ID'].dropna().to_list()
         batch_id = '_'.join(sample_ids[0].split('_')[:-1])
-        archives = [map_batch(sample_ids, batch_id, upload_id, fairmat_Batch)]
+        name, batch = map_batch(sample_ids, batch_id, upload_id, fairmat_Batch)
+        archives = [(f'{name_prefix}{name}', batch)]
         substrates = []
         substrates_col = [
-            'Sample dimension',
-            'Sample area [cm^2]',
-            'Pixel area [cm^2]',
-            'Number of pixels',
-            'Notes',
-            'Substrate material',
-            'Substrate conductive layer',
-        ]
-        substrates_col = [
-            s for s in substrates_col if s in df['Experiment Info'].columns]
-        for i, sub in df['Experiment Info'][substrates_col].drop_duplicates().iterrows():
-            if pd.isna(sub).all():
-                continue
-            substrates.append((f'{i}_substrate', sub, map_substrate(sub, fairmat_Substrate)))
+            s for s in SUBSTRATE_COLUMNS if s in df['Experiment Info'].columns]
+        index = ExperimentIndex(df)
+        with timings.stage('substrates', count=len(df)):
+            substrate_codes = index.encode('Experiment Info', substrates_col)
+            substrate_names = [
+                None if empty else f'{name_prefix}{df.index[first]}_substrate'
+                for first, empty in zip(substrate_codes.first, substrate_codes.empty)
+            ]
+
+        with timings.stage('mapping', count=int((~substrate_codes.empty).sum())):
+            for first, name in zip(substrate_codes.first, substrate_names):
+                if name is None:
+                    continue
+                sub = index.row('Experiment Info', first, substrates_col)
+                substrates.append((name, map_substrate(sub, fairmat_Substrate)))
 
-        def find_substrate(d):
-            for s in substrates:
-                if d.equals(s[1]):
-                    return s[0]
+        with timings.stage('mapping'):
+            for (i, row), code in zip(df['Experiment Info'].iterrows(), substrate_codes.codes):
+                if pd.isna(row).all():
+                    continue
+                substrate_name = None
+                if substrate_names[code] is not None:
+                    substrate_name = substrate_names[code] + '.archive.json'
+                name, sample = map_basic_sample(
+                    row, substrate_name, upload_id, fairmat_Sample)
+                archives.append((f'{name_prefix}{name}', sample))
+            timings.count('mapping', len(archives))
+        samples = [entity for _, entity in archives[1:]]
 
-        for i, row in df['Experiment Info'].iterrows():
-            if pd.isna(row).all():
-                continue
-            substrate_name = find_substrate(
-                row[substrates_col]) + '.archive.json' if substrates_col else None
-            archives.append(map_basic_sample(row, substrate_name, upload_id, fairmat_Sample))
+        nomad_ids = df['Experiment Info']['Nomad ID']
+        plan = compile_layout_plan(tuple(df.columns), PROCESS_MAPPERS)
+        processes = []
+        for step in plan:
+            with timings.stage('grouping', count=len(df)):
+                groups = index.group_rows(step.group, nomad_ids)
+            parameter_lists = [None] * len(groups)
+            if step.typed_parameters:
+                with timings.stage('typing', count=len(groups)):
+                    parameter_lists = generic_parameter_lists(index.rows(
+                        step.group, df.index.get_indexer([j for j, _, _ in groups])))
+            with timings.stage('mapping'):
+                n_archives = len(archives)
+                for (j, row, lab_ids), parameters in zip(groups, parameter_lists):
+                    for name, process in self.map_process_row(
+                            step, j, lab_ids, row, upload_id, parameters):
+                        name = f'{name_prefix}{name}'
+                        archives.append((name, process))
+                        processes.append((name, process, lab_ids))
+                timings.count('mapping', len(archives) - n_archives)
 
-        for i, col in enumerate(df.columns.get_level_values(0).unique()):
-            if col == 'Experiment Info':
-                continue
+        with timings.stage('history', count=len(processes)):
+            add_process_history(
+                archives[0][1], samples, process_history_steps(processes, upload_id))
+        return substrates + archives
 
-            df_dropped = df[col].drop_duplicates()
-            for j, row in df_dropped.iterrows():
-                if row.dropna().empty:
-                    continue
-                lab_ids = [
-                    x['Experiment Info']['Nomad ID']
-                    for _, x in df[['Experiment Info', col]].iterrows()
-                    if x[col].astype('object').equals(row.astype('object'))
-                ]
-                if 'Cleaning' in col:
-                    archives.append(map_cleaning(i, j, lab_ids, row, upload_id, fairmat_Cleaning))
-
-                if 'Laser Scribing' in col:
-                    archives.append(map_laser_scribing(i, j, lab_ids, row, upload_id, fairmat_LaserScribing))
-
-                if 'Generic Process' in col:  # move up
-                    generic_process = map_generic(i, j, lab_ids, row, upload_id, fairmat_Process)
-                    map_generic_parameters(generic_process[1], row)
-                    archives.append(generic_process)
-
-                if pd.isna(row.get('Material name')):
-                    continue
+    def stream_rows(self, header, rows, upload_id, name_prefix=''):
+        """
+        Maps an experiment sheet row by row, `header` are the column keys and
+        `rows` yields `(j, values)` like `iter_xlsx_rows`. All names start with
+        `name_prefix`.
 
-                if 'Evaporation' in col:
-                    coevap = False
-                    if 'Co-Evaporation' in col:
-                        coevap = True
-                    archives.append(
-                        map_evaporation(i, j, lab_ids, row, upload_id, fairmat_Evaporation, coevap)
+        Substrates are yielded as soon as their row is read. The process archives
+        follow once all rows are read, so only the unique rows of every process
+        group and the sample sections are kept in memory. The samples and the
+        batch come last, with their process history.
+        """
+        info_positions = [p for p, (group, _) in enumerate(header) if group == 'Experiment Info']
+        info_columns = pd.Index([header[p][1] for p in info_positions])
+        substrates_col = [s for s in SUBSTRATE_COLUMNS if s in info_columns]
+        plan = compile_layout_plan(tuple(header), PROCESS_MAPPERS)
+        process_positions = [
+            [p for p, (group, _) in enumerate(header) if group == step.group]
+            for step in plan
+        ]
+        process_groups = [ProcessRowGroups() for _ in plan]
+
+        sample_ids = []
+        samples = []
+        substrate_names = {}
+        for j, values in rows:
+            values = [np.nan if v is None else v for v in values]
+            row = pd.Series([values[p] for p in info_positions], index=info_columns, dtype=object)
+            for positions, groups in zip(process_positions, process_groups):
+                groups.add(j, [values[p] for p in positions], row['Nomad ID'])
+            if pd.isna(row).all():
+                continue
+
+            substrate_name = None
+            key = tuple(normalize_value(v) for v in row[substrates_col])
+            if not all(v is None for v in key):
+                if key not in substrate_names:
+                    substrate_names[key] = f'{name_prefix}{j}_substrate'
+                    yield (
+                        substrate_names[key],
+                        map_substrate(row[substrates_col], fairmat_Substrate),
                     )
+                substrate_name = substrate_names[key] + '.archive.json'
+            if not pd.isna(row['Nomad ID']):
+                sample_ids.append(row['Nomad ID'])
+            name, sample = map_basic_sample(
+                row, substrate_name, upload_id, fairmat_Sample)
+            samples.append((f'{name_prefix}{name}', sample))
 
-                if 'Spin Coating' in col:
-                    archives.append(map_spin_coating(i, j, lab_ids, row, upload_id, fairmat_SpinCoating))
+        batch_id = '_'.join(sample_ids[0].split('_')[:-1])
+        batch_name, batch = map_batch(sample_ids, batch_id, upload_id, fairmat_Batch)
 
-                if 'Slot Die Coating' in col:
-                    archives.append(map_sdc(i, j, lab_ids, row, upload_id, fairmat_SlotDieCoating))
+        processes = []
+        for step, groups in zip(plan, process_groups):
+            groups = list(groups)
+            parameter_lists = [None] * len(groups)
+            if step.typed_parameters:
+                parameter_lists = generic_parameter_lists(pd.DataFrame(
+                    [values for _, values, _ in groups], columns=list(step.columns)))
+            for (j, values, lab_ids), parameters in zip(groups, parameter_lists):
+                row = pd.Series(values, index=pd.Index(step.columns), dtype=object)
+                for name, process in self.map_process_row(
+                        step, j, lab_ids, row, upload_id, parameters):
+                    name = f'{name_prefix}{name}'
+                    processes.append((name, process, lab_ids))
+                    yield name, process
 
-                if 'Sputtering' in col:
-                    archives.append(map_sputtering(i, j, lab_ids, row, upload_id, fairmat_Sputtering))
+        add_process_history(
+            batch,
+            [sample for _, sample in samples],
+            process_history_steps(processes, upload_id),
+        )
+        yield from samples
+        yield f'{name_prefix}{batch_name}', batch
 
-                if 'Inkjet Printing' in col:
-                    archives.append(
-                        map_inkjet_printing(i, j, lab_ids, row, upload_id, fairmat_Inkjet_Printing)
-                    )
+    def map_sheet(self, mainfile, sheet_name, upload_id, name_prefix='', key=None):
+        """
+        Reads and maps one experiment sheet of `mainfile`. Returns the archives
+        of `map_frame` and the timings of the sheet.
+        """
+        timings = StageTimings()
+        with timings.stage('reading'):
+            df = read_experiment_frame(mainfile, sheet_name, key)
+        timings.count('reading', len(df))
+        return self.map_frame(df, upload_id, timings, name_prefix), timings
 
-                if 'ALD' in col:
-                    archives.append(
-                        map_atomic_layer_deposition(
-                            i, j, lab_ids, row, upload_id, fairmat_AtomicLayerDeposition)
-                    )
+    def map_sheets(self, mainfile, sheets, upload_id, timings):
+        """
+        Maps the experiment `sheets` of `mainfile` one after the other and yields
+        their archives in sheet order. Timings of all sheets are merged into
+        `timings`.
+        """
+        key = file_key(mainfile)
+        for sheet, prefix in zip(sheets, sheet_name_prefixes(sheets)):
+            archives, sheet_timings = self.map_sheet(
+                mainfile, sheet, upload_id, prefix, key)
+            timings.merge(sheet_timings)
+            yield from archives
 
-        refs = []
-        for subs in substrates:
-            file_name = f'{subs[0]}.archive.json'
-            create_archive(subs[2], archive, file_name)
-            refs.append(get_reference(upload_id, file_name))
+    def stream_sheets(self, mainfile, sheets, upload_id):
+        """Streams the experiment `sheets` of an xlsx workbook one after the other."""
+        for sheet, prefix in zip(sheets, sheet_name_prefixes(sheets)):
+            header = read_xlsx_header(mainfile, sheet_name=sheet)
+            yield from self.stream_rows(
+                header,
+                iter_xlsx_rows(mainfile, len(header), sheet_name=sheet),
+                upload_id,
+                prefix,
+            )
 
-        for a in archives:
-            file_name = f'{a[0]}.archive.json'
-            create_archive(a[1], archive, file_name)
-            refs.append(get_reference(upload_id, file_name))
+    def parse(self, mainfile: str, archive: EntryArchive, logger):
+        upload_id = archive.metadata.upload_id
+        timings = StageTimings()
+        sheets = experiment_sheets(mainfile)
+        if configuration.streaming and mainfile.lower().endswith('.xlsx'):
+            archives = timings.iterate(
+                'streaming', self.stream_sheets(mainfile, sheets, upload_id))
+        else:
+            frame_cache.max_bytes = configuration.frame_cache_size_mb * 1024 * 1024
+            archives = self.map_sheets(mainfile, sheets, upload_id, timings)
+
+        manifest_path = f'{archive.metadata.mainfile}.manifest.json'
+        previous_manifest = None
+        if configuration.incremental:
+            previous_manifest = load_manifest(archive, manifest_path)
+        with ChildArchiveWriter(
+            archive,
+            logger,
+            max_workers=configuration.archive_writer_workers,
+            previous_manifest=previous_manifest,
+        ) as writer:
+            for name, entity in archives:
+                with timings.stage('writing', count=1):
+                    writer.submit(entity, f'{name}.archive.json')
+            with timings.stage('writing'):
+                writer.close()
+        refs = [get_reference(upload_id, file_name) for file_name in writer.written]
+        if configuration.incremental:
+            save_manifest(archive, manifest_path, writer.manifest)
+            logger.info(
+                'skipped unchanged child archives', count=len(writer.skipped)
+            )
 
+        logger.info('fairmatExperimentParser.parse timings', stages=timings.as_dict())
         archive.data = RawfairmatExperiment(processed_archive=refs)
+        if configuration.store_parse_timings:
+            archive.data.parse_stages = [
+                ParseStage(name=name, **stage)
+                for name, stage in timings.as_dict().items()
+            ]
+
+
+def sheet_name_prefixes(sheets):
+    """
+    Returns the prefix of the child archive names of every sheet. The archives of
+    the first sheet keep their names, the ones of later sheets are prefixed with
+    the sheet name so they do not collide.
+    """
+    return [''] + [re.sub(r'[^\w-]+', '_', str(sheet)) + '_' for sheet in sheets[1:]]
+
+
+def validate_frame(df):
+    """Returns warnings about an experiment sheet that parsing would not report."""
+    warnings = []
+    info = df['Experiment Info']
+    nomad_ids = info['Nomad ID']
+    filled = ~info.isna().all(axis=1)
+
+    missing = df.index[filled & nomad_ids.isna()].to_list()
+    if missing:
+        warnings.append(
+            f'Rows {missing} have no Nomad ID and are not part of the batch.')
+    duplicated = sorted(set(nomad_ids[nomad_ids.duplicated() & nomad_ids.notna()]))
+    if duplicated:
+        warnings.append(f'Nomad IDs {duplicated} are used more than once.')
+    sample_ids = nomad_ids.dropna().astype(str).to_list()
+    if not sample_ids:
+        warnings.append('No row has a Nomad ID, the batch cannot be created.')
+    else:
+        batch_id = '_'.join(sample_ids[0].split('_')[:-1])
+        outside = [i for i in sample_ids if not i.startswith(f'{batch_id}_')]
+        if outside:
+            warnings.append(
+                f'Nomad IDs {outside} do not start with the batch ID {batch_id}.')
+
+    for step in compile_layout_plan(tuple(df.columns), PROCESS_MAPPERS):
+        block = df[step.group]
+        if not step.mappers and not step.material_mappers:
+            warnings.append(f'No process type is known for column group "{step.group}".')
+        elif step.material_mappers and not step.mappers:
+            used = ~block.isna().all(axis=1)
+            if 'Material name' not in block.columns:
+                without_material = used
+            else:
+                without_material = used & block['Material name'].isna()
+            if without_material.any():
+                warnings.append(
+                    f'Rows {df.index[without_material].to_list()} of "{step.group}" '
+                    'have no Material name and are skipped.'
+                )
+    return warnings
+
+
+def preview_experiment_file(mainfile, upload_id=None):
+    """
+    Runs the full mapping of an experiment file without writing anything. Returns
+    a summary with the number of entries per type, the entries themselves and
+    validation warnings.
+    """
+    parser = fairmatExperimentParser()
+    sheets = experiment_sheets(mainfile)
+    warnings = []
+    archives = []
+    for sheet, prefix in zip(sheets, sheet_name_prefixes(sheets)):
+        df = read_experiment_frame(mainfile, sheet)
+        sheet_warnings = validate_frame(df)
+        try:
+            archives.extend(parser.map_frame(df, upload_id, name_prefix=prefix))
+        except Exception as e:
+            sheet_warnings.append(f'Mapping failed: {e!r}')
+        if len(sheets) > 1:
+            sheet_warnings = [f'Sheet {sheet}: {w}' for w in sheet_warnings]
+        warnings.extend(sheet_warnings)
+
+    entries = [
+        dict(
+            file_name=f'{name}.archive.json',
+            type=type(entity).__name__,
+            name=getattr(entity, 'name', None),
+            positon_in_experimental_plan=getattr(
+                entity, 'positon_in_experimental_plan', None),
+        )
+        for name, entity in archives
+    ]
+    counts = dict(Counter(entry['type'] for entry in entries))
+    file_names = [entry['file_name'] for entry in entries]
+    duplicated = sorted(f for f, n in Counter(file_names).items() if n > 1)
+    if duplicated:
+        warnings.append(f'Entries {duplicated} would overwrite each other.')
+    return dict(counts=counts, entries=entries, warnings=warnings)
@@ -0,0 +1,440 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import ast
+import csv
+import hashlib
+import io
+import os
+import posixpath
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from xml.etree.ElementTree import iterparse
+
+import openpyxl
+import pandas as pd
+
+"""
+Access to experiment workbooks.
+
+The header is read straight from the sheet XML inside the xlsx zip container,
+so matching never decodes the data rows of a workbook. Decoded workbooks are
+kept in a process-local LRU cache, so parsing the same file again reuses them.
+Very large sheets can instead be streamed row by row.
+
+Besides xlsx workbooks, the same two level header layout is read from csv, tsv
+and parquet files, which skips the costly Excel decoding.
+
+A workbook may hold several experiments, one per sheet with the header layout.
+Sheets are addressed by name, `None` stands for the first sheet and for files
+without sheets.
+"""
+
+EXPERIMENT_INFO_KEY = ('Experiment Info', 'Nomad ID')
+
+MAX_HEADER_BYTES = 1024 * 1024
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+CSV_SEPARATORS = {'.csv': ',', '.tsv': '\t'}
+
+_NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+_CELL_REF_RE = re.compile(r'([A-Z]+)(\d+)')
+
+
+class HeaderTooLargeError(Exception):
+    pass
+
+
+class _CappedReader:
+    """File wrapper that refuses to read beyond `max_bytes`."""
+
+    def __init__(self, f, max_bytes):
+        self._f = f
+        self._remaining = max_bytes
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            raise HeaderTooLargeError()
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._f.read(size)
+        self._remaining -= len(data)
+        return data
+
+
+def _column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def _sheet_paths(zf):
+    """
+    Returns the names and zip member paths of all worksheets as `(name, path)`
+    pairs, in workbook order.
+    """
+    with zf.open('xl/_rels/workbook.xml.rels') as f:
+        targets = {
+            rel.get('Id'): rel.get('Target')
+            for _, rel in iterparse(f)
+            if rel.tag == f'{_NS_PKG_REL}Relationship'
+        }
+    paths = []
+    with zf.open('xl/workbook.xml') as f:
+        for _, element in iterparse(f):
+            if element.tag != f'{_NS_MAIN}sheet':
+                continue
+            target = targets.get(element.get(f'{_NS_REL}id'))
+            if target is None:
+                continue
+            if target.startswith('/'):
+                path = target.lstrip('/')
+            else:
+                path = posixpath.normpath(posixpath.join('xl', target))
+            paths.append((element.get('name'), path))
+    return paths
+
+
+def _read_rows(f, n_rows, max_bytes):
+    """
+    Reads the first `n_rows` rows of a sheet XML. Returns a list of dicts mapping
+    column index to `(type, value)` of the raw cell.
+    """
+    rows = [{} for _ in range(n_rows)]
+    for _, element in iterparse(_CappedReader(f, max_bytes)):
+        if element.tag == f'{_NS_MAIN}row':
+            if int(element.get('r', 0)) >= n_rows:
+                break
+            element.clear()
+            continue
+        if element.tag != f'{_NS_MAIN}c':
+            continue
+        match = _CELL_REF_RE.fullmatch(element.get('r', ''))
+        if not match:
+            continue
+        row_index = int(match.group(2)) - 1
+        if row_index >= n_rows:
+            break
+        cell_type = element.get('t', 'n')
+        if cell_type == 'inlineStr':
+            value = ''.join(t.text or '' for t in element.iter(f'{_NS_MAIN}t'))
+        else:
+            v = element.find(f'{_NS_MAIN}v')
+            value = v.text if v is not None else None
+        if value is not None:
+            rows[row_index][_column_index(match.group(1))] = (cell_type, value)
+    return rows
+
+
+def _read_shared_strings(zf, indices, max_bytes):
+    """Reads the shared strings up to the largest of `indices`."""
+    if not indices or 'xl/sharedStrings.xml' not in zf.namelist():
+        return {}
+    last = max(indices)
+    strings = {}
+    with zf.open('xl/sharedStrings.xml') as f:
+        index = 0
+        for _, element in iterparse(_CappedReader(f, max_bytes)):
+            if element.tag != f'{_NS_MAIN}si':
+                continue
+            if index in indices:
+                strings[index] = ''.join(
+                    t.text or '' for t in element.iter(f'{_NS_MAIN}t')
+                )
+            element.clear()
+            if index >= last:
+                break
+            index += 1
+    return strings
+
+
+def _cell_value(cell, shared_strings):
+    cell_type, value = cell
+    if cell_type == 's':
+        return shared_strings.get(int(value))
+    if cell_type in ('n', 'b'):
+        try:
+            number = float(value)
+        except ValueError:
+            return value
+        return int(number) if number.is_integer() else number
+    return value
+
+
+def _read_sheet_header(zf, sheet_path, n_rows, max_bytes):
+    with zf.open(sheet_path) as f:
+        rows = _read_rows(f, n_rows, max_bytes)
+    shared_indices = {
+        int(value) for row in rows for cell_type, value in row.values()
+        if cell_type == 's'
+    }
+    shared_strings = _read_shared_strings(zf, shared_indices, max_bytes)
+
+    n_columns = max((max(row) + 1 for row in rows if row), default=0)
+    header = [
+        [
+            _cell_value(row[c], shared_strings) if c in row else None
+            for c in range(n_columns)
+        ]
+        for row in rows
+    ]
+    # merged cells only carry their value in the first column, like pandas
+    # forward fill all but the last header row
+    for level in header[:-1]:
+        for c in range(1, n_columns):
+            if level[c] is None:
+                level[c] = level[c - 1]
+    return list(zip(*header))
+
+
+def read_xlsx_header(filename, n_rows=2, max_bytes=MAX_HEADER_BYTES, sheet_name=None):
+    """
+    Returns the column keys formed by the first `n_rows` rows of the sheet
+    `sheet_name` of an xlsx workbook, e.g. `[('Experiment Info', 'Nomad ID'), ...]`.
+
+    At most `max_bytes` of decompressed XML are read from each zip member, a
+    `HeaderTooLargeError` is raised if the header does not fit.
+    """
+    with zipfile.ZipFile(filename) as zf:
+        sheet_paths = _sheet_paths(zf)
+        if sheet_name is not None:
+            sheet_paths = [(n, p) for n, p in sheet_paths if n == sheet_name]
+        if not sheet_paths:
+            return []
+        return _read_sheet_header(zf, sheet_paths[0][1], n_rows, max_bytes)
+
+
+def read_xlsx_experiment_sheets(filename, n_rows=2, max_bytes=MAX_HEADER_BYTES):
+    """Returns the names of all sheets of an xlsx workbook with the header layout."""
+    with zipfile.ZipFile(filename) as zf:
+        return [
+            name
+            for name, path in _sheet_paths(zf)
+            if EXPERIMENT_INFO_KEY in _read_sheet_header(zf, path, n_rows, max_bytes)
+        ]
+
+
+def _fill_header(header):
+    """
+    Forward fills empty and pandas `Unnamed: ...` entries of the upper header
+    levels, as pandas does for merged cells in Excel files.
+    """
+    filled = []
+    for header_key in header:
+        key = list(header_key)
+        for level in range(len(key) - 1):
+            if (key[level] is None or key[level] == '' or str(key[level]).startswith(
+                'Unnamed: '
+            )) and filled:
+                key[level] = filled[-1][level]
+        filled.append(tuple(key))
+    return filled
+
+
+def read_csv_header(filename, sep=',', n_rows=2, max_bytes=MAX_HEADER_BYTES):
+    """Returns the column keys formed by the first `n_rows` lines of a csv file."""
+    with open(filename, encoding='utf-8-sig', newline='') as f:
+        lines = []
+        for _ in range(n_rows):
+            line = f.readline(max_bytes)
+            if not line.endswith(('\n', '\r')) and len(line) >= max_bytes:
+                raise HeaderTooLargeError()
+            lines.append(line)
+    rows = list(csv.reader(io.StringIO(''.join(lines)), delimiter=sep))
+    if len(rows) < n_rows:
+        return []
+    n_columns = max(len(row) for row in rows)
+    rows = [row + [''] * (n_columns - len(row)) for row in rows]
+    return _fill_header(zip(*rows))
+
+
+def _parquet():
+    """Imports `pyarrow.parquet`, an optional dependency for parquet files."""
+    try:
+        # imported on first use, pyarrow is optional and slow to import
+        import pyarrow.parquet as pq  # noqa: PLC0415
+    except ImportError as e:
+        raise ImportError(
+            'reading parquet experiment files requires pyarrow, install '
+            'test-pv-plugin[parquet]'
+        ) from e
+    return pq
+
+
+def _parquet_key(name):
+    """
+    Returns the column key that pandas stored as the parquet column name `name`,
+    the string of the key tuple, or `None` for other columns.
+    """
+    try:
+        key = ast.literal_eval(name)
+    except (ValueError, SyntaxError):
+        return None
+    return key if isinstance(key, tuple) else None
+
+
+def read_parquet_header(filename):
+    """
+    Returns the column keys of a parquet file written by pandas from a frame with
+    a two level column index. Only the schema in the file footer is read.
+    """
+    keys = map(_parquet_key, _parquet().read_schema(filename).names)
+    return _fill_header([key for key in keys if key is not None])
+
+
+def read_header(filename):
+    """Returns the column keys of an experiment file of any supported format."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in CSV_SEPARATORS:
+        return read_csv_header(filename, sep=CSV_SEPARATORS[extension])
+    if extension == '.parquet':
+        return read_parquet_header(filename)
+    return read_xlsx_header(filename)
+
+
+def experiment_sheets(filename):
+    """
+    Returns the names of the sheets with the experiment header layout. Files
+    without sheets give `[None]` if they have the layout.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in CSV_SEPARATORS or extension == '.parquet':
+        return [None] if EXPERIMENT_INFO_KEY in read_header(filename) else []
+    return read_xlsx_experiment_sheets(filename)
+
+
+def is_experiment_file(filename):
+    """Checks if the file has at least one sheet with the experiment header layout."""
+    try:
+        return bool(experiment_sheets(filename))
+    except Exception:
+        return False
+
+
+def iter_xlsx_rows(filename, n_columns, n_header_rows=2, sheet_name=None):
+    """
+    Yields `(j, values)` for every data row of the sheet `sheet_name` of an xlsx
+    workbook, read with openpyxl in read-only mode. `j` counts the data rows from
+    0 like the index of `read_experiment_frame`, `values` is padded or cut to
+    `n_columns` values with `None` for empty cells. Empty rows are skipped.
+    """
+    wb = openpyxl.load_workbook(filename, read_only=True, data_only=True)
+    try:
+        sheet = wb.worksheets[0] if sheet_name is None else wb[sheet_name]
+        rows = sheet.iter_rows(min_row=n_header_rows + 1, values_only=True)
+        for j, row in enumerate(rows):
+            values = list(row[:n_columns])
+            if all(v is None for v in values):
+                continue
+            values.extend([None] * (n_columns - len(values)))
+            yield j, values
+    finally:
+        wb.close()
+
+
+def file_key(filename):
+    """
+    Identifies the content of a file by its path, size, modification time and
+    SHA-256 hash.
+    """
+    stat = os.stat(filename)
+    sha = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns, sha.hexdigest())
+
+
+class FrameCache:
+    """
+    Thread-safe LRU cache of decoded data frames, bounded by the deep memory
+    usage of the cached frames.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._frames = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._frames:
+                return None
+            self._frames.move_to_end(key)
+            return self._frames[key][0]
+
+    def put(self, key, df):
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            if key in self._frames:
+                self._size -= self._frames.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._frames[key] = (df, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._frames.popitem(last=False)
+                self._size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._size = 0
+
+
+frame_cache = FrameCache()
+
+
+def read_experiment_frame(filename, sheet_name=None, key=None):
+    """
+    Returns the experiment sheet `sheet_name` of the xlsx, csv, tsv or parquet
+    file `filename` as a data frame with a two level column index. The frame is
+    shared with other callers through `frame_cache` and must not be modified.
+    `key` is the `file_key` of `filename`, if it is already known.
+    """
+    key = (key or file_key(filename), sheet_name)
+    df = frame_cache.get(key)
+    if df is None:
+        df = _read_frame(filename, sheet_name)
+        frame_cache.put(key, df)
+    return df
+
+
+def _read_frame(filename, sheet_name=None):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in CSV_SEPARATORS:
+        df = pd.read_csv(filename, header=[0, 1], sep=CSV_SEPARATORS[extension])
+    elif extension == '.parquet':
+        table = _parquet().read_table(filename)
+        keys = {name: _parquet_key(name) for name in table.column_names}
+        table = table.select([name for name, key in keys.items() if key is not None])
+        df = table.to_pandas(ignore_metadata=True)
+        df.columns = [keys[name] for name in df.columns]
+    else:
+        return pd.read_excel(
+            filename, header=[0, 1], sheet_name=0 if sheet_name is None else sheet_name)
+    df.columns = pd.MultiIndex.from_tuples(_fill_header(df.columns))
+    return df
@@ -17,14 +17,17 @@
 #
 
 import datetime
+import json
 import os
 import sys
+import threading
+import time
+from collections import OrderedDict
 
 from baseclasses.helper.utilities import (
     create_archive,
     get_entry_id_from_file_name,
     get_reference,
-    set_sample_reference,
 )
 from nomad.datamodel import EntryArchive
 from nomad.datamodel.data import (
@@ -38,51 +41,342 @@ from nomad.metainfo import (
 )
 from nomad.parsing import MatchingParser
 
+from test_pv_plugin.parsers.fairmat_archive_writer import ChildArchiveWriter
 from test_pv_plugin.schema_packages.fairmat_package import (
     fairmat_EQEmeasurement,
     fairmat_JVmeasurement,
     fairmat_Measurement,
     fairmat_SimpleMPPTracking,
 )
+from test_pv_plugin.schema_packages.fairmat_raw_file import file_hash
+from test_pv_plugin.schema_packages.fairmat_sample_index import (
+    lab_id_from_file_name,
+    set_indexed_sample_reference,
+)
 
 """
 This is a hello world style example for an example parser/converter.
 """
 
 
+BUNDLE_SUFFIX = '.measurements.json'
+
+# parent directories searched for bundle manifests listing a measurement file
+BUNDLE_SEARCH_DEPTH = 3
+
+# the raw files of an upload are stored in this directory
+UPLOAD_RAW_DIRECTORY = 'raw'
+
+MEASUREMENT_TYPES = {
+    'jv': fairmat_JVmeasurement,
+    'eqe': fairmat_EQEmeasurement,
+    'mppt': fairmat_SimpleMPPTracking,
+}
+
+
 class RawFilefairmat(EntryData):
     processed_archive = Quantity(
         type=Activity,
     )
 
 
+class RawFilefairmatBundle(EntryData):
+    processed_archive = Quantity(
+        type=Activity,
+        shape=['*'],
+    )
+
+
+def map_measurement_file(file_name, data_file_hash=None):
+    """
+    Creates the measurement entry of the data file `file_name`, its path in the
+    upload, named `<lab id>.<notes>.<type>.<extension>`. Returns the entry and
+    the lab id.
+    """
+    mainfile_split = os.path.basename(file_name).split('.')
+    notes = ''
+    if len(mainfile_split) > 2:
+        notes = '.'.join(mainfile_split[1:-2])
+    measurment_type = mainfile_split[-2].lower()
+    entry = MEASUREMENT_TYPES.get(measurment_type, fairmat_Measurement)()
+
+    search_id = lab_id_from_file_name(file_name)
+    entry.name = f'{search_id} {notes}'
+    entry.description = f'Notes from file name: {notes}'
+
+    entry.data_file = file_name
+    entry.datetime = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+    if measurment_type in MEASUREMENT_TYPES:
+        entry.data_file_hash = data_file_hash
+    return entry, search_id
+
+
+def is_measurement_file(file_name):
+    """Returns whether `file_name` is named like a measurement data file."""
+    name_split = os.path.basename(file_name).split('.')
+    return len(name_split) > 2 and name_split[-2].lower() in MEASUREMENT_TYPES
+
+
+def upload_root(mainfile, upload_path):
+    """Returns the directory of the upload whose file `upload_path` is `mainfile`."""
+    mainfile = os.path.abspath(mainfile)
+    upload_path = os.path.normpath(upload_path)
+    if upload_path and mainfile.endswith(os.sep + upload_path):
+        return mainfile[: -len(upload_path) - 1]
+    return os.path.dirname(mainfile)
+
+
+class FileHashCache:
+    """
+    Thread-safe LRU cache of the content hashes of local files, keyed by path,
+    size and modification time.
+    """
+
+    def __init__(self, max_size=100_000):
+        self.max_size = max_size
+        self._hashes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if key in self._hashes:
+                self._hashes.move_to_end(key)
+                return self._hashes[key]
+        content_hash = file_hash(path)
+        with self._lock:
+            self._hashes[key] = content_hash
+            self._hashes.move_to_end(key)
+            while len(self._hashes) > self.max_size:
+                self._hashes.popitem(last=False)
+        return content_hash
+
+
+file_hashes = FileHashCache()
+
+
+class MeasurementFileIndex:
+    """
+    Thread-safe LRU cache of lab id → sorted paths of the measurement data files
+    of an upload, one per upload directory. An index is rebuilt once it is older
+    than `ttl` seconds or misses a file it is asked about.
+    """
+
+    def __init__(self, ttl=60.0, max_uploads=32):
+        self.ttl = ttl
+        self.max_uploads = max_uploads
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _build(self, root):
+        index = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if is_measurement_file(name):
+                    path = os.path.relpath(os.path.join(directory, name), root)
+                    index.setdefault(name.split('.')[0], []).append(path)
+        for paths in index.values():
+            paths.sort()
+        return index
+
+    def get(self, root, lab_id, upload_path):
+        """
+        Returns the sorted upload paths of the measurement files of the sample
+        `lab_id` in the upload directory `root`, which include `upload_path`.
+        """
+        with self._lock:
+            created, index = self._indexes.get(root, (None, None))
+            if (
+                index is None
+                or time.monotonic() - created > self.ttl
+                or upload_path not in index.get(lab_id, [])
+            ):
+                index = self._build(root)
+                self._indexes[root] = (time.monotonic(), index)
+            self._indexes.move_to_end(root)
+            while len(self._indexes) > self.max_uploads:
+                self._indexes.popitem(last=False)
+            return index.get(lab_id, [])
+
+
+measurement_file_index = MeasurementFileIndex()
+
+
+def find_duplicate_measurement(root, upload_path, lab_id, data_file_hash):
+    """
+    Returns the upload path of the original of the measurement data file
+    `upload_path` in the upload directory `root`: the first file by path of the
+    sample `lab_id` with the content hash `data_file_hash`. Returns `None` if
+    the file is the original itself. The original only depends on the files of
+    the upload, so all copies agree on it regardless of the processing order.
+    """
+    upload_path = os.path.normpath(upload_path)
+    for path in measurement_file_index.get(root, lab_id, upload_path):
+        if path == upload_path:
+            return None
+        try:
+            if file_hashes.get(os.path.join(root, path)) == data_file_hash:
+                return path
+        except OSError:
+            continue
+    return None
+
+
+def measurement_archive_name(file_name):
+    """Returns the name of the measurement archive of the data file `file_name`."""
+    return f'{file_name}.archive.json'
+
+
+def read_bundle(filename):
+    """
+    Returns the measurement files listed in the bundle manifest `filename`, paths
+    relative to its directory. Raises a `ValueError` if `files` is not a list of
+    such paths.
+    """
+    with open(filename) as f:
+        manifest = json.load(f)
+    files = manifest.get('files', []) if isinstance(manifest, dict) else None
+    if not isinstance(files, list) or not all(isinstance(f, str) for f in files):
+        raise ValueError('files of a bundle manifest must be a list of paths')
+    for file_name in files:
+        path = os.path.normpath(file_name)
+        if os.path.isabs(path) or path.split(os.sep)[0] == os.pardir:
+            raise ValueError(f'{file_name} is not inside the bundle directory')
+    return [os.path.normpath(file_name) for file_name in files]
+
+
+_bundled_files = {}
+_bundled_files_lock = threading.Lock()
+
+
+def bundled_files(directory):
+    """
+    Returns the normalized paths of all files listed in the bundle manifests of
+    `directory`. The result is cached until the directory changes.
+    """
+    mtime = os.stat(directory).st_mtime_ns
+    with _bundled_files_lock:
+        cached = _bundled_files.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    files = set()
+    for name in os.listdir(directory):
+        if not name.endswith(BUNDLE_SUFFIX):
+            continue
+        try:
+            files.update(
+                os.path.join(directory, file_name)
+                for file_name in read_bundle(os.path.join(directory, name))
+            )
+        except (OSError, ValueError, AttributeError):
+            continue
+    with _bundled_files_lock:
+        _bundled_files[directory] = (mtime, files)
+    return files
+
+
+def bundle_directories(filename):
+    """
+    Yields the directories whose bundle manifests can list `filename`: its own
+    directory and up to `BUNDLE_SEARCH_DEPTH` parents within the upload.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    for _ in range(BUNDLE_SEARCH_DEPTH + 1):
+        yield directory
+        parent = os.path.dirname(directory)
+        if os.path.basename(directory) == UPLOAD_RAW_DIRECTORY or parent == directory:
+            return
+        directory = parent
+
+
+def is_bundled(filename):
+    """Returns whether `filename` is listed in a bundle manifest."""
+    path = os.path.abspath(filename)
+    return any(path in bundled_files(d) for d in bundle_directories(path))
+
+
 class fairmatParser(MatchingParser):
+    def is_mainfile(
+        self,
+        filename: str,
+        mime: str,
+        buffer: bytes,
+        decoded_buffer: str,
+        compression: str = None,
+    ):
+        is_mainfile_super = super().is_mainfile(
+            filename, mime, buffer, decoded_buffer, compression)
+        if not is_mainfile_super:
+            return False
+        # files listed in a bundle manifest are parsed with the bundle
+        try:
+            return not is_bundled(filename)
+        except OSError:
+            return True
+
     def parse(self, mainfile: str, archive: EntryArchive, logger):
-        mainfile_split = os.path.basename(mainfile).split('.')
-        notes = ''
-        if len(mainfile_split) > 2:
-            notes = '.'.join(mainfile_split[1:-2])
-        measurment_type = mainfile_split[-2].lower()
-        entry = fairmat_Measurement()
-
-        if measurment_type == 'jv':
-            entry = fairmat_JVmeasurement()
-        if measurment_type == 'eqe':
-            entry = fairmat_EQEmeasurement()
-        if measurment_type == 'mppt':
-            entry = fairmat_SimpleMPPTracking()
+        data_file_hash = file_hashes.get(mainfile)
+        upload_path = archive.metadata.mainfile
+        entry, search_id = map_measurement_file(upload_path, data_file_hash)
         archive.metadata.entry_name = os.path.basename(mainfile)
 
-        search_id = mainfile_split[0]
-        set_sample_reference(archive, entry, search_id)
-
-        entry.name = f'{search_id} {notes}'
-        entry.description = f'Notes from file name: {notes}'
-
-        entry.data_file = os.path.basename(mainfile)
-        entry.datetime = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+        file_name = measurement_archive_name(upload_path)
+        duplicate = find_duplicate_measurement(
+            upload_root(mainfile, upload_path), upload_path, search_id, data_file_hash)
+        if duplicate:
+            logger.info('data file already has a measurement', measurement=duplicate)
+            eid = get_entry_id_from_file_name(measurement_archive_name(duplicate), archive)
+            archive.data = RawFilefairmat(
+                processed_archive=get_reference(archive.metadata.upload_id, eid))
+            return
 
-        file_name = f'{os.path.basename(mainfile)}.archive.json'
+        set_indexed_sample_reference(archive, entry, search_id)
         eid = get_entry_id_from_file_name(file_name, archive)
         archive.data = RawFilefairmat(processed_archive=get_reference(archive.metadata.upload_id, eid))
         create_archive(entry, archive, file_name)
+
+
+class fairmatBundleParser(MatchingParser):
+    """
+    Parses all measurement files listed in a `*.measurements.json` manifest,
+    `{"files": ["<lab id>.<notes>.jv.txt", ...]}`, with paths relative to the
+    directory of the manifest. The samples of all files are looked up in the sample index of the
+    upload and the measurement archives are written in one pass.
+    """
+
+    def parse(self, mainfile: str, archive: EntryArchive, logger):
+        directory = os.path.dirname(mainfile)
+        upload_directory = os.path.dirname(archive.metadata.mainfile)
+        root = upload_root(mainfile, archive.metadata.mainfile)
+        archive.metadata.entry_name = os.path.basename(mainfile)
+        duplicates = []
+        with ChildArchiveWriter(archive, logger) as writer:
+            for data_file in read_bundle(mainfile):
+                if not os.path.isfile(os.path.join(directory, data_file)):
+                    logger.warning(
+                        'bundled measurement file not found', file_name=data_file)
+                    continue
+                data_file_hash = file_hashes.get(os.path.join(directory, data_file))
+                upload_path = os.path.join(upload_directory, data_file)
+                entry, search_id = map_measurement_file(upload_path, data_file_hash)
+                file_name = measurement_archive_name(upload_path)
+                duplicate = find_duplicate_measurement(
+                    root, upload_path, search_id, data_file_hash)
+                if duplicate:
+                    duplicates.append(measurement_archive_name(duplicate))
+                    continue
+                set_indexed_sample_reference(archive, entry, search_id)
+                writer.submit(entry, file_name)
+            writer.close()
+
+        if duplicates:
+            logger.info('data files already have a measurement', count=len(duplicates))
+        refs = [
+            get_reference(
+                archive.metadata.upload_id,
+                get_entry_id_from_file_name(file_name, archive),
+            )
+            for file_name in writer.written + duplicates
+        ]
+        archive.data = RawFilefairmatBundle(processed_archive=refs)
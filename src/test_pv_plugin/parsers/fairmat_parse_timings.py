@@ -0,0 +1,90 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import time
+from contextlib import contextmanager
+
+"""
+Wall-clock and CPU time bookkeeping for the stages of a parse.
+"""
+
+
+class StageTimings:
+    """
+    Accumulates wall-clock time, CPU time and item counts per named stage. A
+    stage can be entered several times, e.g. once per process group.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def _get(self, name):
+        return self.stages.setdefault(
+            name, {'wall_time': 0.0, 'cpu_time': 0.0, 'count': 0}
+        )
+
+    @contextmanager
+    def stage(self, name, count=0):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            stage = self._get(name)
+            stage['wall_time'] += time.perf_counter() - wall_start
+            stage['cpu_time'] += time.process_time() - cpu_start
+            stage['count'] += count
+
+    def add(self, name, wall_time=0.0, cpu_time=0.0, count=0):
+        stage = self._get(name)
+        stage['wall_time'] += wall_time
+        stage['cpu_time'] += cpu_time
+        stage['count'] += count
+
+    def iterate(self, name, iterable):
+        """
+        Yields from `iterable`, recording the time spent producing each item as
+        stage `name`.
+        """
+        iterator = iter(iterable)
+        while True:
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.add(
+                    name,
+                    wall_time=time.perf_counter() - wall_start,
+                    cpu_time=time.process_time() - cpu_start,
+                )
+            self.count(name, 1)
+            yield item
+
+    def merge(self, other):
+        """Adds the stages of the `StageTimings` `other`."""
+        for name, stage in other.stages.items():
+            self.add(name, **stage)
+
+    def count(self, name, count):
+        self._get(name)['count'] += count
+
+    def as_dict(self):
+        return {name: dict(stage) for name, stage in self.stages.items()}
@@ -13,6 +13,32 @@ class NewSchemaPackageEntryPoint(SchemaPackageEntryPoint):
 
 class fairmatPackageEntryPoint(SchemaPackageEntryPoint):
     parameter: int = Field(0, description='Custom configuration parameter')
+    sample_index_ttl: float = Field(
+        60.0,
+        description='Seconds after which the lab id index of an upload used to find '
+        'the samples of measurements is rebuilt.',
+    )
+    sample_index_max_uploads: int = Field(
+        32, description='Number of uploads whose lab id index is kept per worker.'
+    )
+    hdf5_arrays: bool = Field(
+        False,
+        description='Write the arrays of JV, EQE and MPPT data files to an HDF5 file '
+        'next to the data file and keep only references and summary values in the '
+        'archive.',
+    )
+    hdf5_min_values: int = Field(
+        10000,
+        description='Number of array values of a data file from which on they are '
+        'written to HDF5 if `hdf5_arrays` is set.',
+    )
+    normalization_cache: bool = Field(
+        False,
+        description='Keep the values derived from measurement data files in a JSON '
+        'file next to them in the upload and reuse them on reprocessing as long as '
+        'the data file, the plugin and reader versions and the settings are '
+        'unchanged. The files are visible in the upload and published with it.',
+    )
 
     def load(self):
         from test_pv_plugin.schema_packages.fairmat_package import m_package
@@ -0,0 +1,109 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import h5py
+import numpy as np
+from nomad.config import config
+
+from test_pv_plugin.schema_packages.file_parser.mppt_parser import lttb
+
+"""
+Opt-in HDF5 storage of the arrays of measurement data files.
+
+With `hdf5_arrays` set on the schema package entry point, the arrays read from
+a data file with at least `hdf5_min_values` values are written to an HDF5 file
+next to it in the upload. The archive keeps the summary values, an HDF5
+reference to the file and, for the plots, every curve decimated to
+`CURVE_PLOT_POINTS` points.
+"""
+
+configuration = config.get_plugin_entry_point(
+    'test_pv_plugin.schema_packages:fairmat_schema_package_entry_point'
+)
+
+HDF5_SUFFIX = '.arrays.h5'
+
+CURVE_PLOT_POINTS = 200
+
+DATASET_UNITS = {
+    'time': 's',
+    'voltage': 'V',
+    'current_density': 'mA/cm^2',
+    'power_density': 'mW/cm^2',
+    'photon_energy': 'eV',
+    'wavelength': 'nm',
+}
+
+
+def use_hdf5(*arrays):
+    """Returns whether `arrays` are to be stored in HDF5 instead of the archive."""
+    return configuration.hdf5_arrays and (
+        sum(array.size for array in arrays) >= configuration.hdf5_min_values
+    )
+
+
+def hdf5_file_name(data_file):
+    return data_file + HDF5_SUFFIX
+
+
+def plot_points(x, y, n_out=CURVE_PLOT_POINTS):
+    """Returns the indices of the finite points of the curve `x`, `y` to plot."""
+    finite = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    return finite[lttb(x[finite], y[finite], n_out)]
+
+
+def column_groups(names, **arrays):
+    """
+    Returns the groups of `write_nxdata` for the columns of the 2D `arrays`, one
+    per column `c`, named `{c}_{names[c]}` to keep repeated and empty names apart.
+    """
+    return {
+        f'{c}_{name}'.replace('/', '_'): {
+            dataset: array[:, c] for dataset, array in arrays.items()
+        }
+        for c, name in enumerate(names)
+    }
+
+
+def write_nxdata(f, groups):
+    """
+    Writes `groups`, a dict of group name to a dict of dataset name to 1D array,
+    to the binary file `f` as HDF5 file of NXdata groups. The first dataset of a
+    group is its axis, the last one its signal.
+    """
+    with h5py.File(f, 'w') as h5:
+        for group_name, datasets in groups.items():
+            group = h5.create_group(group_name)
+            names = list(datasets)
+            group.attrs.update(NX_class='NXdata', axes=names[0], signal=names[-1])
+            for name, values in datasets.items():
+                dataset = group.create_dataset(
+                    name, data=values, compression='gzip', shuffle=True
+                )
+                if name in DATASET_UNITS:
+                    dataset.attrs['units'] = DATASET_UNITS[name]
+
+
+def write_hdf5_arrays(archive, data_file, groups):
+    """
+    Writes `groups` with `write_nxdata` to the HDF5 file of the raw file
+    `data_file` of the upload of `archive`. Returns the HDF5 reference of it.
+    """
+    file_name = hdf5_file_name(data_file)
+    with archive.m_context.raw_file(file_name, 'wb') as f:
+        write_nxdata(f, groups)
+    return f'{file_name}#/'
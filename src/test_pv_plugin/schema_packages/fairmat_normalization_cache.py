@@ -0,0 +1,133 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import hashlib
+import io
+import json
+import os
+from importlib.metadata import PackageNotFoundError, version
+
+from nomad.config import config
+
+"""
+Cache of the values that measurement normalizers derive from their data files.
+
+The cache is opt-in with `normalization_cache` on the schema package entry
+point. After a data file is read, the derived quantities and sub sections of the
+measurement are written to a JSON file next to the data file, together with a
+fingerprint of the data file hash, the version of this package, the version of
+the reader and the settings that change the derived values. When an entry with
+the same fingerprint is normalized again, e.g. when an upload is reprocessed,
+the derived values are taken from this file.
+
+The content hash is only taken from the cache while the size and modification
+time of the data file are the ones it was written with, otherwise the data file
+is hashed again, and only parsed if its content changed.
+"""
+
+configuration = config.get_plugin_entry_point(
+    'test_pv_plugin.schema_packages:fairmat_schema_package_entry_point'
+)
+
+CACHE_SUFFIX = '.normalized.json'
+
+try:
+    PACKAGE_VERSION = version('test-pv-plugin')
+except PackageNotFoundError:
+    PACKAGE_VERSION = None
+
+
+def normalization_settings():
+    """Returns the settings of the schema package that change derived values."""
+    return dict(
+        hdf5_arrays=configuration.hdf5_arrays,
+        hdf5_min_values=configuration.hdf5_min_values,
+    )
+
+
+def normalization_fingerprint(data_file_hash, parser_version, settings=None):
+    """
+    Returns the fingerprint of normalizing a data file with the content hash
+    `data_file_hash` with this package version, the reader version
+    `parser_version` and `settings`.
+    """
+    if settings is None:
+        settings = normalization_settings()
+    key = json.dumps(
+        [data_file_hash, PACKAGE_VERSION, parser_version, settings], sort_keys=True
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def raw_file_stat(archive, path):
+    """
+    Returns the size and modification time in ns of the raw file `path` of the
+    upload of `archive`, `None` if it is not a local file.
+    """
+    try:
+        with archive.m_context.raw_file(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def cache_file_name(data_file):
+    return data_file + CACHE_SUFFIX
+
+
+def read_normalization_cache(archive, data_file):
+    """
+    Returns the cache of the raw file `data_file` of the upload of `archive` as
+    dict with the `fingerprint`, the `data_file_hash` and `stat` of the data file
+    and the derived `values`, `None` if there is none.
+    """
+    if not configuration.normalization_cache:
+        return None
+    file_name = cache_file_name(data_file)
+    try:
+        if not archive.m_context.raw_path_exists(file_name):
+            return None
+        with archive.m_context.raw_file(file_name, 'r') as f:
+            cached = json.load(f)
+    except Exception:
+        return None
+    if not isinstance(cached, dict) or 'values' not in cached:
+        return None
+    return cached
+
+
+def write_normalization_cache(archive, section, fingerprint, names, stat=None):
+    """
+    Writes the quantities and sub sections `names` of the measurement `section`
+    as the derived values of its data file with `fingerprint` and the `stat`
+    of the data file they were read from.
+    """
+    if not configuration.normalization_cache:
+        return
+    serialized = section.m_to_dict()
+    values = {name: serialized[name] for name in names if name in serialized}
+    with archive.m_context.raw_file(cache_file_name(section.data_file), 'w') as f:
+        json.dump(
+            dict(
+                fingerprint=fingerprint,
+                data_file_hash=section.data_file_hash,
+                stat=stat,
+                values=values,
+            ),
+            f,
+        )
@@ -27,7 +27,6 @@ from baseclasses import (
     LayerDeposition,
 )
 from baseclasses.helper.add_solar_cell import add_band_gap
-from baseclasses.helper.utilities import get_encoding, set_sample_reference
 from baseclasses.material_processes_misc import (
     Cleaning,
     LaserScribing,
@@ -43,6 +42,8 @@ from baseclasses.solar_energy import (
     SolcarCellSample,
     Substrate,
 )
+from baseclasses.solar_energy.eqemeasurement import SolarCellEQECustom
+from baseclasses.solar_energy.jvmeasurement import SolarCellJVCurve
 from baseclasses.solution import Solution, SolutionPreparationStandard
 from baseclasses.vapour_based_deposition import (
     ALDPropertiesIris,
@@ -61,8 +62,42 @@ from baseclasses.wet_chemical_deposition import (
     WetChemicalDeposition,
 )
 from nomad.datamodel.data import ArchiveSection, EntryData
+from nomad.datamodel.hdf5 import HDF5Reference
 from nomad.metainfo import Quantity, SchemaPackage, Section, SubSection
 
+from test_pv_plugin.schema_packages.fairmat_hdf5 import (
+    column_groups,
+    plot_points,
+    use_hdf5,
+    write_hdf5_arrays,
+)
+from test_pv_plugin.schema_packages.fairmat_normalization_cache import (
+    normalization_fingerprint,
+    raw_file_stat,
+    read_normalization_cache,
+    write_normalization_cache,
+)
+from test_pv_plugin.schema_packages.fairmat_raw_file import read_raw_file
+from test_pv_plugin.schema_packages.fairmat_sample_index import (
+    lab_id_from_file_name,
+    set_indexed_sample_reference,
+)
+from test_pv_plugin.schema_packages.file_parser.eqe_parser import (
+    PARSER_VERSION as EQE_PARSER_VERSION,
+    eqe_figures_of_merit,
+    read_eqe,
+)
+from test_pv_plugin.schema_packages.file_parser.jv_parser import (
+    PARSER_VERSION as JV_PARSER_VERSION,
+    jv_figures_of_merit,
+    read_jv,
+)
+from test_pv_plugin.schema_packages.file_parser.mppt_parser import (
+    PARSER_VERSION as MPPT_PARSER_VERSION,
+    lttb,
+    read_mppt,
+)
+
 m_package = SchemaPackage()
 
 
@@ -133,6 +168,45 @@ class fairmat_Solution(Solution, EntryData):
     preparation = SubSection(section_def=SolutionPreparationStandard)
 
 
+class ProcessHistoryStep(ArchiveSection):
+    m_def = Section(label_quantity='name')
+    process = Quantity(
+        type=BaseProcess,
+        description="""
+        The process entry of this step.
+        """,
+    )
+
+    process_type = Quantity(
+        type=str,
+        description="""
+        The section definition of the process, e.g. fairmat_SpinCoating.
+        """,
+    )
+
+    position = Quantity(
+        type=int,
+        description="""
+        The position of the process in the experimental plan.
+        """,
+    )
+
+    name = Quantity(type=str)
+
+    layer_type = Quantity(type=str)
+
+    layer_material = Quantity(type=str)
+
+    lab_ids = Quantity(
+        type=str,
+        shape=['*'],
+        description="""
+        The lab ids of the samples that went through this step. Only set in the
+        history of a batch.
+        """,
+    )
+
+
 class fairmat_Sample(SolcarCellSample, EntryData):
     m_def = Section(
         a_eln=dict(
@@ -144,6 +218,8 @@ class fairmat_Sample(SolcarCellSample, EntryData):
         label_quantity='sample_id',
     )
 
+    process_history = SubSection(section_def=ProcessHistoryStep, repeats=True)
+
 
 class fairmat_Batch(Batch, EntryData):
     m_def = Section(
@@ -153,6 +229,8 @@ class fairmat_Batch(Batch, EntryData):
         )
     )
 
+    process_history = SubSection(section_def=ProcessHistoryStep, repeats=True)
+
 
 # %% ####################### Cleaning
 class fairmat_Cleaning(Cleaning, EntryData):
@@ -486,6 +564,112 @@ class fairmat_Storage(Storage, EntryData):
 
 # %%####################################### Measurements
 
+
+def get_jv_curves(jv, decimate=False):
+    """
+    Creates a `SolarCellJVCurve` per curve of a JV file read with `read_jv`, with
+    the voltage and current density decimated for plotting if `decimate`.
+    """
+    fom = jv_figures_of_merit(jv['voltage'], jv['current_density'], jv['light_intensity'])
+    jv_curves = []
+    for c, cell_name in enumerate(jv['cell_names']):
+        voltage, current_density = jv['voltage'][:, c], jv['current_density'][:, c]
+        if decimate:
+            kept = plot_points(voltage, current_density)
+            voltage, current_density = voltage[kept], current_density[kept]
+        jv_curves.append(
+            SolarCellJVCurve(
+                cell_name=cell_name,
+                voltage=voltage,
+                current_density=current_density,
+                light_intensity=jv['light_intensity'],
+                open_circuit_voltage=fom['open_circuit_voltage'][c],
+                short_circuit_current_density=fom['short_circuit_current_density'][c],
+                fill_factor=fom['fill_factor'][c],
+                efficiency=fom['efficiency'][c],
+                potential_at_maximum_power_point=fom[
+                    'potential_at_maximum_power_point'
+                ][c],
+                current_density_at_maximun_power_point=fom[
+                    'current_density_at_maximum_power_point'
+                ][c],
+                series_resistance=fom['series_resistance'][c],
+                shunt_resistance=fom['shunt_resistance'][c],
+            )
+        )
+    return jv_curves
+
+
+def use_normalization_cache(section, archive, cached, data_file_hash, parser_version):
+    """
+    Sets the derived values of `section` from the normalization cache `cached`
+    if it was written for a data file with the content hash `data_file_hash`
+    read with `parser_version`. Returns whether it was used.
+    """
+    fingerprint = normalization_fingerprint(data_file_hash, parser_version)
+    if cached.get('fingerprint') != fingerprint:
+        return False
+    hdf5_file = cached['values'].get('hdf5_data', '').split('#')[0]
+    if hdf5_file and not archive.m_context.raw_path_exists(hdf5_file):
+        return False
+    section.m_update_from_dict(cached['values'])
+    section.data_file_hash = data_file_hash
+    section.normalization_fingerprint = fingerprint
+    return True
+
+
+def normalize_data_file(section, archive, logger, derived, parser_version):
+    """
+    Sets the quantities and sub sections `derived` of the measurement `section`
+    from its data file with `section.read_data_file`, or from the normalization
+    cache if the data file content, plugin version, reader version
+    `parser_version` and settings did not change.
+    """
+    stat = raw_file_stat(archive, section.data_file)
+    cached = read_normalization_cache(archive, section.data_file)
+    # the cached hash is only trusted for the data file it was computed from
+    if cached is not None and stat is not None and cached.get('stat') == stat:
+        data_file_hash = cached.get('data_file_hash')
+        if use_normalization_cache(
+            section, archive, cached, data_file_hash, parser_version
+        ):
+            return
+
+    with read_raw_file(archive, section.data_file) as raw_file:
+        section.data_file_hash = raw_file.data_file_hash
+        # e.g. the same file uploaded again
+        if cached is not None and use_normalization_cache(
+            section, archive, cached, section.data_file_hash, parser_version
+        ):
+            return
+        if not section.read_data_file(archive, raw_file, logger):
+            return
+    section.normalization_fingerprint = normalization_fingerprint(
+        section.data_file_hash, parser_version
+    )
+    try:
+        write_normalization_cache(
+            archive, section, section.normalization_fingerprint, derived, stat
+        )
+    except Exception as e:
+        logger.warning('could not write normalization cache', exc_info=e)
+
+
+def store_hdf5_arrays(section, archive, logger, groups):
+    """
+    Writes `groups` to the HDF5 file of the data file of the measurement
+    `section` and references it in `hdf5_data`. Returns `False` if the file
+    could not be written, the arrays are then to be kept in the archive.
+    """
+    try:
+        section.hdf5_data = write_hdf5_arrays(archive, section.data_file, groups)
+    except Exception as e:
+        logger.warning(
+            'could not write HDF5 arrays, keeping them in the archive', exc_info=e)
+        return False
+    return True
+
+
 class fairmat_JVmeasurement(JVMeasurement, EntryData):
     m_def = Section(
         a_eln=dict(
@@ -528,21 +712,77 @@ class fairmat_JVmeasurement(JVMeasurement, EntryData):
         ],
     )
 
+    data_file_hash = Quantity(
+        type=str,
+        description="""
+        The SHA-256 hash of the content of the data file.
+        """,
+    )
+
+    hdf5_data = Quantity(
+        type=HDF5Reference,
+        description="""
+        The arrays of the data file, if they are stored in an HDF5 file. The JV
+        curves then only hold a decimated series for plotting.
+        """,
+    )
+
+    normalization_fingerprint = Quantity(
+        type=str,
+        description="""
+        The fingerprint of the data file content, plugin version and settings the
+        values derived from the data file were computed with.
+        """,
+    )
+
     def normalize(self, archive, logger):
         if not self.samples and self.data_file:
-            search_id = self.data_file.split('.')[0]
-            set_sample_reference(archive, self, search_id,
-                                 upload_id=archive.metadata.upload_id)
+            search_id = lab_id_from_file_name(self.data_file)
+            set_indexed_sample_reference(archive, self, search_id,
+                                         upload_id=archive.metadata.upload_id)
         if self.data_file:
-            # todo detect file format
-            with archive.m_context.raw_file(self.data_file, 'br') as f:
-                encoding = get_encoding(f)
-
-            with archive.m_context.raw_file(self.data_file, 'tr', encoding=encoding) as f:
-                pass  # ad dparsing here
+            normalize_data_file(
+                self, archive, logger, ('jv_curve', 'hdf5_data'), JV_PARSER_VERSION
+            )
 
         super().normalize(archive, logger)
 
+    def read_data_file(self, archive, raw_file, logger):
+        # todo detect file format
+        try:
+            jv = read_jv(raw_file.text)
+        except ValueError as e:
+            logger.warning('could not read JV data file', exc_info=e)
+            return False
+        in_hdf5 = use_hdf5(jv['voltage'], jv['current_density']) and store_hdf5_arrays(
+            self,
+            archive,
+            logger,
+            column_groups(
+                jv['cell_names'],
+                voltage=jv['voltage'],
+                current_density=jv['current_density'],
+            ),
+        )
+        self.jv_curve = get_jv_curves(jv, decimate=in_hdf5)
+        return True
+
+
+MPPT_DERIVED = (
+    'time',
+    'voltage',
+    'current_density',
+    'power_density',
+    'initial_power_density',
+    'peak_power_density',
+    'final_power_density',
+    't80',
+    't95',
+    'time_plot',
+    'power_density_plot',
+    'hdf5_data',
+)
+
 
 class fairmat_SimpleMPPTracking(MPPTracking, EntryData):
     m_def = Section(
@@ -560,8 +800,8 @@ class fairmat_SimpleMPPTracking(MPPTracking, EntryData):
         ),
         a_plot=[
             {
-                'x': 'time',
-                'y': 'power_density',
+                'x': 'time_plot',
+                'y': 'power_density_plot',
                 'layout': {
                     'showlegend': True,
                     'yaxis': {'fixedrange': False},
@@ -571,21 +811,160 @@ class fairmat_SimpleMPPTracking(MPPTracking, EntryData):
         ],
     )
 
+    data_file_hash = Quantity(
+        type=str,
+        description="""
+        The SHA-256 hash of the content of the data file.
+        """,
+    )
+
+    hdf5_data = Quantity(
+        type=HDF5Reference,
+        description="""
+        The arrays of the data file, if they are stored in an HDF5 file.
+        """,
+    )
+
+    normalization_fingerprint = Quantity(
+        type=str,
+        description="""
+        The fingerprint of the data file content, plugin version and settings the
+        values derived from the data file were computed with.
+        """,
+    )
+
+    initial_power_density = Quantity(
+        type=np.float64,
+        unit='mW/cm^2',
+        a_eln=dict(defaultDisplayUnit='mW/cm^2'),
+    )
+
+    peak_power_density = Quantity(
+        type=np.float64,
+        unit='mW/cm^2',
+        a_eln=dict(defaultDisplayUnit='mW/cm^2'),
+    )
+
+    final_power_density = Quantity(
+        type=np.float64,
+        unit='mW/cm^2',
+        a_eln=dict(defaultDisplayUnit='mW/cm^2'),
+    )
+
+    t80 = Quantity(
+        type=np.float64,
+        unit='s',
+        description="""
+        The time at which the power density first fell below 80 % of the peak
+        power density reached up to then.
+        """,
+        a_eln=dict(defaultDisplayUnit='h'),
+    )
+
+    t95 = Quantity(
+        type=np.float64,
+        unit='s',
+        description="""
+        The time at which the power density first fell below 95 % of the peak
+        power density reached up to then.
+        """,
+        a_eln=dict(defaultDisplayUnit='h'),
+    )
+
+    time_plot = Quantity(
+        type=np.float64,
+        shape=['*'],
+        unit='s',
+        description="""
+        The time of the decimated series shown in the plot.
+        """,
+    )
+
+    power_density_plot = Quantity(
+        type=np.float64,
+        shape=['*'],
+        unit='mW/cm^2',
+        description="""
+        The power density of the decimated series shown in the plot.
+        """,
+    )
+
     def normalize(self, archive, logger):
         if not self.samples and self.data_file:
-            search_id = self.data_file.split('.')[0]
-            set_sample_reference(archive, self, search_id,
-                                 upload_id=archive.metadata.upload_id)
+            search_id = lab_id_from_file_name(self.data_file)
+            set_indexed_sample_reference(archive, self, search_id,
+                                         upload_id=archive.metadata.upload_id)
 
         if self.data_file:
-            with archive.m_context.raw_file(self.data_file, 'br') as f:
-                encoding = get_encoding(f)
-
-            with archive.m_context.raw_file(self.data_file, 'tr', encoding=encoding) as f:
-                pass  # add parsing here
+            normalize_data_file(
+                self, archive, logger, MPPT_DERIVED, MPPT_PARSER_VERSION
+            )
 
         super().normalize(archive, logger)
 
+    def read_data_file(self, archive, raw_file, logger):
+        try:
+            mppt = read_mppt(raw_file.text_stream())
+        except ValueError as e:
+            logger.warning('could not read MPPT data file', exc_info=e)
+            return False
+        self.set_mppt(archive, mppt, logger)
+        return True
+
+    def set_mppt(self, archive, mppt, logger):
+        arrays = {
+            quantity: mppt[quantity]
+            for quantity in ('time', 'voltage', 'current_density', 'power_density')
+            if quantity in mppt
+        }
+        if not (
+            use_hdf5(*arrays.values())
+            and store_hdf5_arrays(self, archive, logger, dict(mppt=arrays))
+        ):
+            for quantity, value in arrays.items():
+                setattr(self, quantity, value)
+        statistics = mppt['statistics']
+        self.initial_power_density = statistics.initial_power_density
+        if statistics.initial_power_density is not None:
+            self.peak_power_density = statistics.peak_power_density
+        self.final_power_density = statistics.final_power_density
+        self.t80 = statistics.t80
+        self.t95 = statistics.t95
+        if 'power_density' in mppt:
+            kept = lttb(mppt['time'], mppt['power_density'])
+            self.time_plot = mppt['time'][kept]
+            self.power_density_plot = mppt['power_density'][kept]
+
+
+def get_eqe_data(eqe, fom, decimate=False):
+    """
+    Creates a `SolarCellEQECustom` per spectrum of an EQE file read with
+    `read_eqe`, with the figures `fom` from `eqe_figures_of_merit` and the
+    spectrum decimated for plotting if `decimate`.
+    """
+    eqe_data = []
+    for c in range(len(eqe['names'])):
+        photon_energy = eqe['photon_energy'][:, c]
+        wavelength = eqe['wavelength'][:, c]
+        eqe_array = eqe['eqe'][:, c]
+        if decimate:
+            kept = plot_points(photon_energy, eqe_array)
+            photon_energy, wavelength = photon_energy[kept], wavelength[kept]
+            eqe_array = eqe_array[kept]
+        eqe_data.append(
+            SolarCellEQECustom(
+                raw_photon_energy_array=photon_energy,
+                raw_wavelength_array=wavelength,
+                raw_eqe_array=eqe_array,
+                photon_energy_array=photon_energy,
+                wavelength_array=wavelength,
+                eqe_array=eqe_array,
+                bandgap_eqe=fom['bandgap_eqe'][c],
+                integrated_jsc=fom['integrated_jsc'][c],
+            )
+        )
+    return eqe_data
+
 
 class fairmat_EQEmeasurement(EQEMeasurement, EntryData):
     m_def = Section(
@@ -617,26 +996,70 @@ class fairmat_EQEmeasurement(EQEMeasurement, EntryData):
         ],
     )
 
+    data_file_hash = Quantity(
+        type=str,
+        description="""
+        The SHA-256 hash of the content of the data file.
+        """,
+    )
+
+    hdf5_data = Quantity(
+        type=HDF5Reference,
+        description="""
+        The arrays of the data file, if they are stored in an HDF5 file. The EQE
+        data then only hold a decimated series for plotting.
+        """,
+    )
+
+    normalization_fingerprint = Quantity(
+        type=str,
+        description="""
+        The fingerprint of the data file content, plugin version and settings the
+        values derived from the data file were computed with.
+        """,
+    )
+
     def normalize(self, archive, logger):
         if not self.samples and self.data_file:
-            search_id = self.data_file.split('.')[0]
-            set_sample_reference(archive, self, search_id,
-                                 upload_id=archive.metadata.upload_id)
+            search_id = lab_id_from_file_name(self.data_file)
+            set_indexed_sample_reference(archive, self, search_id,
+                                         upload_id=archive.metadata.upload_id)
 
         if self.data_file:
-            with archive.m_context.raw_file(self.data_file, 'br') as f:
-                encoding = get_encoding(f)
-            with archive.m_context.raw_file(self.data_file, 'tr', encoding=encoding) as f:
-                pass  # add parsing here
-
-            eqe_data = []
-
-            if eqe_data:
-                band_gaps = np.array([d.bandgap_eqe.magnitude for d in eqe_data])
+            normalize_data_file(
+                self, archive, logger, ('eqe_data', 'hdf5_data'), EQE_PARSER_VERSION
+            )
+
+        if self.eqe_data:
+            band_gaps = np.array(
+                [d.bandgap_eqe.magnitude for d in self.eqe_data if d.bandgap_eqe is not None]
+            )
+            if np.isfinite(band_gaps).any():
                 add_band_gap(archive, band_gaps[np.isfinite(band_gaps)].mean())
 
         super().normalize(archive, logger)
 
+    def read_data_file(self, archive, raw_file, logger):
+        try:
+            eqe = read_eqe(raw_file.text)
+        except ValueError as e:
+            logger.warning('could not read EQE data file', exc_info=e)
+            return False
+        fom = eqe_figures_of_merit(eqe['photon_energy'], eqe['eqe'])
+        in_hdf5 = use_hdf5(eqe['photon_energy'], eqe['eqe']) and store_hdf5_arrays(
+            self,
+            archive,
+            logger,
+            column_groups(
+                eqe['names'],
+                photon_energy=eqe['photon_energy'],
+                wavelength=eqe['wavelength'],
+                eqe=eqe['eqe'],
+            ),
+        )
+        self.eqe_data = get_eqe_data(eqe, fom, decimate=in_hdf5)
+        return True
+
 
 # %%####################################### Generic Entries
 
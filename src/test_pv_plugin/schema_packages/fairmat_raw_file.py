@@ -0,0 +1,200 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import codecs
+import hashlib
+import io
+import mmap
+import threading
+from collections import OrderedDict
+from functools import cached_property
+
+from baseclasses.helper.utilities import get_encoding
+
+"""
+Access to the raw data files of measurements.
+
+A data file is read once, memory mapped if it is a local file, and the encoding
+detection, the content hash and the decoded text all use that one buffer.
+
+Encodings are detected from a byte order mark or a strict UTF-8 decode of the
+start of the file. Only files that are neither are given to the statistical
+detection of `get_encoding`, and only with a bounded sample.
+"""
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+UTF8_PREFIX_BYTES = 64 * 1024
+
+ENCODING_SAMPLE_BYTES = 1024 * 1024
+
+# UTF-32 first, its little endian BOM starts with the UTF-16 one
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def content_hash(f, chunk_size=HASH_CHUNK_SIZE):
+    """Returns the SHA-256 hex digest of the binary file `f`, read in chunks."""
+    sha = hashlib.sha256()
+    for chunk in iter(lambda: f.read(chunk_size), b''):
+        sha.update(chunk)
+    return sha.hexdigest()
+
+
+def file_hash(filename):
+    """Returns the SHA-256 hex digest of the local file `filename`."""
+    with open(filename, 'rb') as f:
+        return content_hash(f)
+
+
+def detect_encoding(
+    buffer, prefix_bytes=UTF8_PREFIX_BYTES, sample_bytes=ENCODING_SAMPLE_BYTES
+):
+    """
+    Detects the encoding of the bytes-like `buffer`: a byte order mark, else
+    UTF-8 if the first `prefix_bytes` decode strictly, else `get_encoding` on the
+    first `sample_bytes`.
+    """
+    head = bytes(buffer[:4])
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    try:
+        # a multi-byte character may be cut at the end of the prefix
+        codecs.getincrementaldecoder('utf-8')().decode(
+            bytes(buffer[:prefix_bytes]), final=len(buffer) <= prefix_bytes)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    return get_encoding(io.BytesIO(bytes(buffer[:sample_bytes])))
+
+
+class EncodingCache:
+    """Thread-safe LRU cache of detected encodings, keyed by content hash."""
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self._encodings = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._encodings:
+                return None
+            self._encodings.move_to_end(key)
+            return self._encodings[key]
+
+    def put(self, key, encoding):
+        with self._lock:
+            self._encodings[key] = encoding
+            self._encodings.move_to_end(key)
+            while len(self._encodings) > self.max_size:
+                self._encodings.popitem(last=False)
+
+
+encoding_cache = EncodingCache()
+
+
+class _BufferReader(io.RawIOBase):
+    """Raw binary stream over a memoryview, reads without copying the buffer."""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        chunk = self._buffer[self._position : self._position + len(b)]
+        b[: len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+
+class RawDataFile:
+    """
+    The content of the open binary file `f`. Use as a context manager, `text`
+    and `data_file_hash` remain valid after closing.
+    """
+
+    def __init__(self, f):
+        self._file = f
+        self._mmap = None
+        try:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.buffer = memoryview(self._mmap)
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            # not a local file or an empty one
+            self.buffer = memoryview(f.read())
+
+    @cached_property
+    def encoding(self):
+        encoding = encoding_cache.get(self.data_file_hash)
+        if encoding is None:
+            encoding = detect_encoding(self.buffer)
+            encoding_cache.put(self.data_file_hash, encoding)
+        return encoding
+
+    @cached_property
+    def text(self):
+        try:
+            return str(self.buffer, self.encoding)
+        except UnicodeDecodeError:
+            # only the start of the file was checked, detect on all of it
+            encoding = get_encoding(io.BytesIO(self.buffer))
+            encoding_cache.put(self.data_file_hash, encoding)
+            self.encoding = encoding
+            return str(self.buffer, encoding)
+
+    @cached_property
+    def data_file_hash(self):
+        return hashlib.sha256(self.buffer).hexdigest()
+
+    def text_stream(self):
+        """
+        Returns a text stream over the buffer, decoded incrementally, for files
+        that are too large to hold as one string. Only valid until closed.
+        """
+        return io.TextIOWrapper(
+            io.BufferedReader(_BufferReader(self.buffer)),
+            encoding=self.encoding,
+            errors='replace',
+        )
+
+    def close(self):
+        self.buffer.release()
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_raw_file(archive, path):
+    """Returns the `RawDataFile` of the raw file `path` of the upload of `archive`."""
+    return RawDataFile(archive.m_context.raw_file(path, 'br'))
@@ -0,0 +1,154 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from baseclasses.helper.utilities import get_reference, set_sample_reference
+from nomad.config import config
+from nomad.datamodel.metainfo.basesections import CompositeSystemReference
+
+"""
+Upload scoped index from lab ids to sample entries.
+
+Measurements find their sample by the lab id in the file name. Instead of one
+search per measurement, all entries of an upload are fetched with one query the
+first time a lab id of the upload is looked up. Indexes are kept per worker
+process with a time to live and a bound on the number of uploads.
+"""
+
+configuration = config.get_plugin_entry_point(
+    'test_pv_plugin.schema_packages:fairmat_schema_package_entry_point'
+)
+
+SAMPLE_ENTRY_TYPES = ('fairmat_Sample',)
+
+
+def lab_id_from_file_name(file_name):
+    """
+    Returns the lab id of the measurement data file `file_name`, a path in the
+    upload to a file named `<lab id>.<notes>.<type>.<extension>`.
+    """
+    return os.path.basename(file_name).split('.')[0]
+
+
+def search_upload_entries(archive, upload_id):
+    """
+    Yields the `entry_id`, `upload_id`, `entry_type` and `results.eln.lab_ids`
+    of all sample entries (`SAMPLE_ENTRY_TYPES`) of the upload `upload_id`
+    visible to the author of `archive`.
+    """
+    from nomad.app.v1.models import MetadataRequired
+    from nomad.search import search_iterator
+
+    yield from search_iterator(
+        owner='all',
+        query={
+            'upload_id': upload_id,
+            'entry_type:any': list(SAMPLE_ENTRY_TYPES),
+        },
+        required=MetadataRequired(
+            include=['entry_id', 'upload_id', 'entry_type', 'results.eln.lab_ids']
+        ),
+        user_id=archive.metadata.main_author.user_id,
+    )
+
+
+class SampleIndex:
+    """
+    Thread-safe LRU cache of lab id → `(upload_id, entry_id)` indexes, one per
+    upload. An index is rebuilt once it is older than `ttl` seconds. Lab ids
+    shared by several sample entries of an upload map to `None`.
+    """
+
+    def __init__(self, ttl=60.0, max_uploads=32, search=search_upload_entries):
+        self.ttl = ttl
+        self.max_uploads = max_uploads
+        self._search = search
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _build(self, archive, upload_id):
+        index = {}
+        for entry in self._search(archive, upload_id):
+            if entry.get('entry_type') not in SAMPLE_ENTRY_TYPES:
+                continue
+            lab_ids = entry.get('results', {}).get('eln', {}).get('lab_ids', [])
+            for lab_id in lab_ids:
+                if lab_id in index:
+                    index[lab_id] = None
+                else:
+                    index[lab_id] = (entry['upload_id'], entry['entry_id'])
+        return index
+
+    def get(self, archive, upload_id, lab_id):
+        """
+        Returns the `(upload_id, entry_id)` of the sample with `lab_id` in the
+        upload `upload_id`, or `None` if there is not exactly one. The index is
+        built without holding the lock, so lookups in other uploads are not
+        blocked by the search.
+        """
+        with self._lock:
+            created, index = self._indexes.get(upload_id, (None, None))
+            if index is not None and time.monotonic() - created <= self.ttl:
+                self._indexes.move_to_end(upload_id)
+                return index.get(lab_id)
+
+        index = self._build(archive, upload_id)
+        with self._lock:
+            self._indexes[upload_id] = (time.monotonic(), index)
+            self._indexes.move_to_end(upload_id)
+            while len(self._indexes) > self.max_uploads:
+                self._indexes.popitem(last=False)
+        return index.get(lab_id)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+
+sample_index = SampleIndex(
+    ttl=configuration.sample_index_ttl,
+    max_uploads=configuration.sample_index_max_uploads,
+)
+
+
+def set_indexed_sample_reference(archive, entry, search_id, upload_id=None):
+    """
+    Sets the sample reference of the measurement `entry` from the sample index
+    of the upload of `archive`. Falls back to `set_sample_reference` with the
+    given arguments if there is no upload or the index has no unique sample.
+    """
+    index_upload_id = upload_id or archive.metadata.upload_id
+    hit = None
+    if index_upload_id:
+        try:
+            hit = sample_index.get(archive, index_upload_id, search_id)
+        except Exception:
+            hit = None
+    if hit is None:
+        if upload_id is None:
+            set_sample_reference(archive, entry, search_id)
+        else:
+            set_sample_reference(archive, entry, search_id, upload_id=upload_id)
+        return
+    entry.samples = [
+        CompositeSystemReference(reference=get_reference(*hit), lab_id=search_id)
+    ]
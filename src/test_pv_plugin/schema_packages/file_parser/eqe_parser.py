@@ -0,0 +1,147 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import os
+import re
+from functools import cache
+
+import numpy as np
+
+from test_pv_plugin.schema_packages.file_parser.text_table import read_table
+
+"""
+Reader for EQE exports and the figures of all spectra of a file.
+
+An EQE export has `key: value` header lines followed by a table, a line of
+column names and one row per wavelength. Columns named after the wavelength or
+nm hold the wavelength in nm, columns named after the photon energy or eV the
+photon energy in eV. Every other column is the EQE of one spectrum, e.g. one
+pixel, as fraction or in %, measured at the closest such column to its left.
+"""
+
+# bump when `read_eqe` or the figures of merit change
+PARSER_VERSION = 1
+
+WAVELENGTH_RE = re.compile(r'wavelength|lambda|\bnm\b', re.I)
+
+PHOTON_ENERGY_RE = re.compile(r'energy|\bev\b', re.I)
+
+HC_EV_NM = 1239.841984  # h * c in eV * nm
+
+HC_J_M = 1.986445857e-25  # h * c in J * m
+
+ELEMENTARY_CHARGE = 1.602176634e-19  # C
+
+AM15G_FILE = os.path.join(os.path.dirname(__file__), 'data', 'am15g.csv')
+
+BANDGAP_SMOOTHING = 5  # points
+
+# renamed from trapz in NumPy 2.0
+trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
+
+@cache
+def am15g_photon_flux():
+    """
+    Returns the wavelength in nm and the photon flux in 1/(s*m^2*nm) of the
+    ASTM G173 AM1.5G reference spectrum.
+    """
+    wavelength, irradiance = np.loadtxt(
+        AM15G_FILE, delimiter=',', skiprows=2, unpack=True
+    )
+    return wavelength, irradiance * wavelength * 1e-9 / HC_J_M
+
+
+def read_eqe(text):
+    """
+    Reads an EQE export. Returns a dict with the `header`, the `names` of the
+    spectra and their `photon_energy` in eV, `wavelength` in nm and `eqe` as
+    fraction, arrays of shape `(n_points, n_spectra)`.
+    """
+    header, names, data = read_table(text)
+    if data.shape[0] < 2:
+        raise ValueError('an EQE spectrum needs at least two points')
+    energy_columns = [c for c, name in enumerate(names) if PHOTON_ENERGY_RE.search(name)]
+    x_columns = energy_columns + [
+        c for c, name in enumerate(names) if WAVELENGTH_RE.search(name)
+    ]
+    if not x_columns:
+        x_columns = [0]
+        if np.nanmax(data[:, 0]) < 20:
+            energy_columns = [0]
+    eqe_columns = [c for c in range(len(names)) if c not in x_columns]
+    if not eqe_columns:
+        raise ValueError('no EQE column found')
+    spectrum_x_columns = [
+        max((x for x in x_columns if x < c), default=min(x_columns))
+        for c in eqe_columns
+    ]
+
+    x = data[:, spectrum_x_columns]
+    is_energy = np.isin(spectrum_x_columns, energy_columns)
+    with np.errstate(divide='ignore'):
+        photon_energy = np.where(is_energy, x, HC_EV_NM / x)
+    eqe = data[:, eqe_columns]
+    eqe = np.where(np.nanmax(eqe, axis=0) > 1.5, eqe / 100, eqe)
+    return dict(
+        header=header,
+        names=[names[c] for c in eqe_columns],
+        photon_energy=photon_energy,
+        wavelength=HC_EV_NM / photon_energy,
+        eqe=eqe,
+    )
+
+
+def _moving_average(y, window):
+    """Moving average along axis 0 with the edge values repeated."""
+    if window < 2 or y.shape[0] < window:
+        return y
+    padded = np.pad(y, ((window // 2, (window - 1) // 2), (0, 0)), mode='edge')
+    total = np.cumsum(padded, axis=0)
+    total = np.concatenate([np.zeros((1, y.shape[1])), total])
+    return (total[window:] - total[:-window]) / window
+
+
+def eqe_figures_of_merit(photon_energy, eqe, smoothing=BANDGAP_SMOOTHING):
+    """
+    Computes the figures of all spectra at once from `photon_energy` in eV and
+    `eqe` as fraction, arrays of shape `(n_points, n_spectra)`.
+
+    Returns a dict of arrays with one value per spectrum: `integrated_jsc` in
+    mA/cm^2 under AM1.5G over the measured range and `bandgap_eqe` in eV, the
+    photon energy of the maximum of the derivative of the EQE after a moving
+    average over `smoothing` points.
+    """
+    order = np.argsort(photon_energy, axis=0)
+    energy = np.take_along_axis(photon_energy, order, axis=0)
+    eqe = np.take_along_axis(eqe, order, axis=0)
+
+    wavelength = HC_EV_NM / energy
+    reference_wavelength, reference_flux = am15g_photon_flux()
+    flux = np.interp(wavelength, reference_wavelength, reference_flux, left=0, right=0)
+    # photon energy ascending means wavelength descending
+    jsc = -trapezoid(eqe * flux, wavelength, axis=0) * ELEMENTARY_CHARGE
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.diff(_moving_average(eqe, smoothing), axis=0) / np.diff(energy, axis=0)
+    i = np.argmax(np.where(np.isfinite(slope), slope, -np.inf), axis=0)
+    columns = np.arange(energy.shape[1])
+    return dict(
+        # A/m^2 = 0.1 mA/cm^2
+        integrated_jsc=jsc * 0.1,
+        bandgap_eqe=(energy[i, columns] + energy[i + 1, columns]) / 2,
+    )
@@ -0,0 +1,170 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import numpy as np
+
+from test_pv_plugin.schema_packages.file_parser.text_table import (
+    header_number,
+    read_table,
+)
+
+"""
+Reader for JV exports and the figures of merit of all curves of a file.
+
+A JV export has `key: value` header lines followed by a table, a line of column
+names and one row per voltage step. Columns with `volt` in their name hold the
+voltage in V, every other column the current density in mA/cm^2 of one curve,
+i.e. one cell and scan direction, measured at the closest voltage column to its
+left.
+"""
+
+# part of the normalization cache fingerprint, bump it when `read_jv` or the
+# figures of merit change
+PARSER_VERSION = 1
+
+DEFAULT_LIGHT_INTENSITY = 100.0  # mW/cm^2
+
+FIGURES_OF_MERIT = (
+    'open_circuit_voltage',
+    'short_circuit_current_density',
+    'fill_factor',
+    'efficiency',
+    'potential_at_maximum_power_point',
+    'current_density_at_maximum_power_point',
+    'series_resistance',
+    'shunt_resistance',
+)
+
+
+def read_jv(text):
+    """
+    Reads a JV export. Returns a dict with the `header`, the `cell_names` of the
+    curves, their `light_intensity` in mW/cm^2 and the `voltage` and
+    `current_density` of all curves as arrays of shape `(n_points, n_curves)`.
+    """
+    header, names, data = read_table(text)
+    voltage_columns = [c for c, name in enumerate(names) if 'volt' in name.lower()]
+    if not voltage_columns:
+        voltage_columns = [0]
+    current_columns = [c for c in range(len(names)) if c not in voltage_columns]
+    curve_voltage_columns = [
+        max((v for v in voltage_columns if v < c), default=voltage_columns[0])
+        for c in current_columns
+    ]
+    return dict(
+        header=header,
+        cell_names=[names[c] for c in current_columns],
+        light_intensity=header_number(header, 'intensity', DEFAULT_LIGHT_INTENSITY),
+        voltage=data[:, curve_voltage_columns],
+        current_density=data[:, current_columns],
+    )
+
+
+def _segment_at(x, x0):
+    """
+    Returns per column the index `i` of the segment `x[i]`, `x[i + 1]` that holds
+    `x0`, clipped to the first and last segment. `x` is sorted along axis 0.
+    """
+    i = (x <= x0).sum(axis=0) - 1
+    return np.clip(i, 0, x.shape[0] - 2)
+
+
+def _interpolate(x, y, i, x0):
+    """
+    Interpolates `y` at `x0` on the segments `i` of every column. Returns the
+    values and the slopes `dx/dy` of the segments.
+    """
+    columns = np.arange(x.shape[1])
+    x1, x2 = x[i, columns], x[i + 1, columns]
+    y1, y2 = y[i, columns], y[i + 1, columns]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return y1 + (x0 - x1) * (y2 - y1) / (x2 - x1), (x2 - x1) / (y2 - y1)
+
+
+def jv_figures_of_merit(
+    voltage, current_density, light_intensity=DEFAULT_LIGHT_INTENSITY
+):
+    """
+    Computes the figures of merit of all curves at once from `voltage` in V and
+    `current_density` in mA/cm^2, arrays of shape `(n_points, n_curves)`, at a
+    `light_intensity` in mW/cm^2.
+
+    Returns a dict of arrays with one value per curve: `open_circuit_voltage`
+    and `potential_at_maximum_power_point` in V,
+    `short_circuit_current_density` and `current_density_at_maximum_power_point`
+    in mA/cm^2, `fill_factor` as fraction, `efficiency` in % and
+    `series_resistance` and `shunt_resistance` in ohm*cm^2. The sign convention
+    of the current is detected per curve. Rows with missing values are dropped
+    per curve, curves with less than two points have no figures of merit.
+    """
+    finite = np.isfinite(voltage) & np.isfinite(current_density)
+    if not finite.all():
+        fom = {name: np.full(voltage.shape[1], np.nan) for name in FIGURES_OF_MERIT}
+        complete = finite.all(axis=0)
+        # the complete curves at once, the others one by one
+        groups = [(complete, slice(None))] if complete.any() else []
+        groups += [([c], finite[:, c]) for c in np.flatnonzero(~complete)]
+        for columns, rows in groups:
+            values = jv_figures_of_merit(
+                voltage[rows][:, columns],
+                current_density[rows][:, columns],
+                light_intensity,
+            )
+            for name in FIGURES_OF_MERIT:
+                fom[name][columns] = values[name]
+        return fom
+    if voltage.shape[0] < 2:
+        return {name: np.full(voltage.shape[1], np.nan) for name in FIGURES_OF_MERIT}
+
+    order = np.argsort(voltage, axis=0)
+    v = np.take_along_axis(voltage, order, axis=0)
+    j = np.take_along_axis(current_density, order, axis=0)
+    columns = np.arange(v.shape[1])
+
+    # short circuit current and shunt resistance at 0 V
+    jsc, dv_dj_sc = _interpolate(v, j, _segment_at(v, 0.0), 0.0)
+    sign = np.where(jsc < 0, -1.0, 1.0)
+    j = j * sign
+    jsc = jsc * sign
+
+    # open circuit voltage and series resistance at the first current zero crossing
+    positive = j > 0
+    crossing = positive[:-1] & ~positive[1:]
+    has_crossing = crossing.any(axis=0)
+    i_oc = np.argmax(crossing, axis=0)
+    voc, dj_dv_oc = _interpolate(-j, v, i_oc, 0.0)
+    voc = np.where(has_crossing, voc, np.nan)
+
+    power = np.where((v >= 0) & (j >= 0), v * j, -np.inf)
+    i_mpp = np.argmax(power, axis=0)
+    vmpp = v[i_mpp, columns]
+    jmpp = j[i_mpp, columns]
+    pmax = vmpp * jmpp
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return dict(
+            open_circuit_voltage=voc,
+            short_circuit_current_density=jsc,
+            fill_factor=pmax / (voc * jsc),
+            efficiency=pmax / light_intensity * 100,
+            potential_at_maximum_power_point=vmpp,
+            current_density_at_maximum_power_point=jmpp,
+            # V / (mA/cm^2) = 1000 ohm*cm^2
+            series_resistance=np.abs(1 / dj_dv_oc) * 1000,
+            shunt_resistance=np.abs(dv_dj_sc) * 1000,
+        )
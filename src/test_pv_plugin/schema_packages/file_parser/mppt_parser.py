@@ -0,0 +1,173 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from itertools import chain, islice
+
+import numpy as np
+
+from test_pv_plugin.schema_packages.file_parser.text_table import (
+    load_rows,
+    read_header,
+    split_fields,
+    table_rows,
+)
+
+"""
+Streaming reader for MPP tracking logs.
+
+Stability runs log for weeks, so the table is parsed in chunks of a bounded
+number of rows, the figures of the run are accumulated chunk by chunk and only
+a decimated series is meant for plotting.
+"""
+
+# bump when `read_mppt` or the statistics change, cached values are then redone
+PARSER_VERSION = 1
+
+CHUNK_ROWS = 100_000
+
+PLOT_POINTS = 2000
+
+TIME_UNITS = {'(h)': 3600.0, '[h]': 3600.0, '(min)': 60.0, '[min]': 60.0}
+
+COLUMN_KEYWORDS = (
+    ('time', 'time'),
+    ('voltage', 'volt'),
+    ('current_density', 'current'),
+    ('power_density', 'power'),
+)
+
+
+class MPPTStatistics:
+    """
+    Running statistics of the power density of an MPP tracking run. `t80` and
+    `t95` are the times at which the power first falls below 80 % and 95 % of
+    the peak power reached up to then.
+    """
+
+    def __init__(self):
+        self.initial_power_density = None
+        self.final_power_density = None
+        self.peak_power_density = -np.inf
+        self.t80 = None
+        self.t95 = None
+
+    def update(self, time, power_density):
+        # a single missing sample would otherwise be the peak of the run
+        finite = np.isfinite(power_density)
+        if not finite.all():
+            time, power_density = time[finite], power_density[finite]
+        if len(power_density) == 0:
+            return
+        if self.initial_power_density is None:
+            self.initial_power_density = power_density[0]
+        self.final_power_density = power_density[-1]
+        running_peak = np.fmax.accumulate(
+            np.fmax(power_density, self.peak_power_density))
+        self.peak_power_density = running_peak[-1]
+        for name, fraction in (('t80', 0.8), ('t95', 0.95)):
+            if getattr(self, name) is not None:
+                continue
+            below = np.flatnonzero(power_density < fraction * running_peak)
+            if len(below):
+                setattr(self, name, time[below[0]])
+
+
+def _columns(names):
+    columns = {}
+    for quantity, keyword in COLUMN_KEYWORDS:
+        for c, name in enumerate(names):
+            if keyword in name.lower() and c not in columns.values():
+                columns[quantity] = c
+                break
+    return columns
+
+
+def read_mppt(f, chunk_rows=CHUNK_ROWS):
+    """
+    Reads an MPP tracking log from the text stream `f`: `key: value` header
+    lines and a table with time, voltage, current density and power density
+    columns, found by name. Times are converted to s. Returns a dict with the
+    `header`, the columns as arrays and the `statistics` of the run.
+    """
+    header, names, delimiter, first_rows = read_header(f)
+    n_columns = len(split_fields(first_rows[0], delimiter))
+    columns = _columns(names)
+    if 'time' not in columns:
+        raise ValueError('no time column found')
+    time_name = names[columns['time']].lower()
+    time_factor = next(
+        (factor for unit, factor in TIME_UNITS.items() if unit in time_name), 1.0)
+
+    statistics = MPPTStatistics()
+    chunks = {quantity: [] for quantity in columns}
+    rows = chain(first_rows, f)
+    ended = False
+    while not ended and (chunk := list(islice(rows, chunk_rows))):
+        try:
+            data = load_rows(chunk, delimiter, n_columns)
+        except ValueError:
+            # only validate the rows of the chunk in which the table ends
+            table = list(table_rows(iter(chunk), delimiter, n_columns))
+            ended = len(table) < sum(1 for line in chunk if line.strip())
+            data = load_rows(table, delimiter, n_columns)
+        if data.size == 0:
+            # only empty lines left
+            continue
+        values = {quantity: data[:, c] for quantity, c in columns.items()}
+        values['time'] = values['time'] * time_factor
+        if 'power_density' not in columns and {'voltage', 'current_density'} <= set(values):
+            values['power_density'] = np.abs(values['voltage'] * values['current_density'])
+            chunks.setdefault('power_density', [])
+        for quantity, value in values.items():
+            chunks[quantity].append(value)
+        if 'power_density' in values:
+            statistics.update(values['time'], values['power_density'])
+
+    result = {quantity: np.concatenate(chunk) for quantity, chunk in chunks.items()}
+    result['header'] = header
+    result['statistics'] = statistics
+    return result
+
+
+def lttb(x, y, n_out=PLOT_POINTS):
+    """
+    Decimates the series `x`, `y` to `n_out` points with the largest triangle
+    three buckets algorithm, which keeps the visual shape of the series.
+    Returns the indices of the kept points.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    kept = np.empty(n_out, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        start, end = edges[b], edges[b + 1]
+        next_start, next_end = edges[b + 1], edges[b + 2] if b + 2 < len(edges) else n
+        if next_end <= next_start:
+            next_end = next_start + 1
+        x_next = x[next_start:next_end].mean()
+        y_next = y[next_start:next_end].mean()
+        area = np.abs(
+            (x[a] - x_next) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (y_next - y[a])
+        )
+        a = start + int(np.argmax(area))
+        kept[b + 1] = a
+    return kept
@@ -0,0 +1,160 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import re
+
+import numpy as np
+
+"""
+Measurement exports as text tables: `key: value` header lines, a line of column
+names and the data rows, separated by tabs, semicolons, commas or whitespace.
+Numbers may use a decimal comma unless the comma is the delimiter.
+"""
+
+NUMBER_RE = re.compile(r'[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?|[-+]?(nan|inf)', re.I)
+DECIMAL_COMMA_RE = re.compile(r'[-+]?(\d+,\d*|,\d+)([eE][-+]?\d+)?')
+
+
+def delimiter(line):
+    for d in ('\t', ';', ','):
+        if d in line:
+            return d
+    return None
+
+
+def split_fields(line, d):
+    fields = [field.strip() for field in line.split(d)]
+    # a trailing delimiter is no empty last column
+    while fields and not fields[-1]:
+        fields.pop()
+    return fields
+
+
+def is_number(field):
+    return bool(NUMBER_RE.fullmatch(field) or DECIMAL_COMMA_RE.fullmatch(field))
+
+
+def is_data_row(fields):
+    return bool(fields) and all(is_number(field) for field in fields)
+
+
+def header_value(line):
+    """Splits a header line into key and value, `(None, None)` if it has none."""
+    for d in (':', '\t', '='):
+        if d in line:
+            key, value = line.split(d, 1)
+            return key.strip(), value.strip()
+    return None, None
+
+
+def header_number(header, keyword, default=None):
+    """Returns the first number of the header value whose key contains `keyword`."""
+    for key, value in header.items():
+        if keyword in key.lower():
+            match = NUMBER_RE.search(value)
+            if match:
+                return float(match.group(0))
+    return default
+
+
+def read_header(lines):
+    """
+    Consumes the lines of the iterator `lines` up to the start of the table, a
+    data row after a names line with as many fields or followed by a data row
+    with as many fields, so that numeric header lines are not taken for it.
+    Returns the header as dict, the column names, the delimiter and the
+    consumed data rows.
+    """
+    previous = []
+    candidate = None
+    for line in lines:
+        if not line.strip():
+            continue
+        d = delimiter(line)
+        fields = split_fields(line, d)
+        if not is_data_row(fields):
+            if candidate is not None:
+                previous.append(candidate)
+                candidate = None
+            previous.append(line)
+            continue
+        if candidate is not None:
+            if len(split_fields(candidate, d)) == len(fields):
+                rows = [candidate, line]
+                break
+            previous.append(candidate)
+        candidate = line
+        if previous and len(split_fields(previous[-1], d)) == len(fields):
+            if not is_data_row(split_fields(previous[-1], d)):
+                rows = [line]
+                break
+    else:
+        if candidate is None:
+            raise ValueError('no data table found')
+        # a single data row without names
+        rows = [candidate]
+        d = delimiter(candidate)
+
+    names = []
+    if previous and not is_data_row(split_fields(previous[-1], d)):
+        names = split_fields(previous.pop(), d)
+    header = {}
+    for header_line in previous:
+        key, value = header_value(header_line)
+        if key:
+            header[key] = value
+    return header, names, d, rows
+
+
+def table_rows(lines, d, n_columns):
+    """
+    Yields the lines of the iterator `lines` up to the first one that is not a
+    data row with `n_columns` fields, e.g. a footer. Skips empty lines.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        fields = split_fields(line, d)
+        if len(fields) != n_columns or not is_data_row(fields):
+            return
+        yield line
+
+
+def load_rows(rows, d, n_columns):
+    """
+    Reads the first `n_columns` fields of the data rows `rows` into a 2D float
+    array. Decimal commas are read as points unless `d` is a comma.
+    """
+    if d != ',':
+        rows = [row.replace(',', '.') for row in rows]
+    return np.loadtxt(rows, delimiter=d, ndmin=2, usecols=range(n_columns))
+
+
+def read_table(text):
+    """
+    Splits an export into its header and table. Returns the header as dict, the
+    column names and the table as 2D float array.
+    """
+    lines = iter(text.splitlines())
+    header, names, d, rows = read_header(lines)
+    n_columns = len(split_fields(rows[0], d))
+    rows += table_rows(lines, d, n_columns)
+    data = load_rows(rows, d, n_columns)
+    names = names[:n_columns]
+    names += [f'column {c}' for c in range(len(names), n_columns)]
+    return header, names, data
@@ -0,0 +1,89 @@
+
+import pytest
+
+from test_pv_plugin.parsers.fairmat_archive_writer import (
+    ChildArchiveWriter,
+    archive_hash,
+)
+
+
+class _Logger:
+    def __init__(self):
+        self.errors = []
+
+    def error(self, event, **kwargs):
+        self.errors.append(kwargs['file_name'])
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_child_archive_writer(max_workers):
+    written = []
+
+    def write(entity, file_name):
+        if entity == 3:
+            raise ValueError('cannot serialize')
+        written.append(file_name)
+
+    logger = _Logger()
+    with ChildArchiveWriter(
+        None, logger, max_workers=max_workers, max_pending=2, write=write
+    ) as writer:
+        for i in range(10):
+            writer.submit(i, f'{i}.archive.json')
+
+    expected = [f'{i}.archive.json' for i in range(10) if i != 3]
+    assert writer.written == expected
+    assert sorted(written) == sorted(expected)
+    assert writer.failed == logger.errors == ['3.archive.json']
+
+
+class _Entity:
+    def __init__(self, value):
+        self.value = value
+
+    def m_to_dict(self, **kwargs):
+        return {'value': self.value}
+
+
+class _Archive:
+    class m_context:
+        @staticmethod
+        def raw_path_exists(path):
+            return True
+
+
+def test_child_archive_writer_skips_unchanged():
+    previous_manifest = {
+        'a.archive.json': archive_hash(_Entity(1)),
+        'b.archive.json': archive_hash(_Entity(1)),
+    }
+    written = []
+    with ChildArchiveWriter(
+        _Archive(),
+        _Logger(),
+        write=lambda entity, file_name: written.append(file_name),
+        previous_manifest=previous_manifest,
+    ) as writer:
+        writer.submit(_Entity(1), 'a.archive.json')
+        writer.submit(_Entity(2), 'b.archive.json')
+        writer.submit(_Entity(3), 'c.archive.json')
+
+    assert written == ['b.archive.json', 'c.archive.json']
+    assert writer.skipped == ['a.archive.json']
+    assert writer.written == ['a.archive.json', 'b.archive.json', 'c.archive.json']
+    assert writer.manifest['b.archive.json'] == archive_hash(_Entity(2))
+
+
+def test_child_archive_writer_manifest_without_failed():
+    def write(entity, file_name):
+        if entity.value == 2:
+            raise ValueError('cannot serialize')
+
+    with ChildArchiveWriter(
+        _Archive(), _Logger(), write=write, previous_manifest={}
+    ) as writer:
+        writer.submit(_Entity(1), 'a.archive.json')
+        writer.submit(_Entity(2), 'b.archive.json')
+
+    assert writer.failed == ['b.archive.json']
+    assert list(writer.manifest) == ['a.archive.json']
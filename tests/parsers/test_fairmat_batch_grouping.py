@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from test_pv_plugin.parsers.fairmat_batch_grouping import ExperimentIndex
+
+
+def _group_process_rows(block, lab_ids):
+    """Groups the rows of `block` row by row, as reference for the index."""
+    values = block.astype('object').where(block.notna(), None).to_numpy()
+    groups = {}
+    for position, key in enumerate(map(tuple, values)):
+        groups.setdefault(key, []).append(position)
+    return [
+        (block.index[positions[0]], [lab_ids.iloc[p] for p in positions])
+        for key, positions in groups.items()
+        if not all(v is None for v in key)
+    ]
+
+
+def test_experiment_index():
+    df = pd.DataFrame(
+        {
+            ('Experiment Info', 'Nomad ID'): ['s_0', 's_1', 's_2', 's_3', 's_4'],
+            ('1: Evaporation', 'Material name'): ['A', 'A', np.nan, 'B', 'A'],
+            ('1: Evaporation', 'Thickness [nm]'): [10.0, 10.0, np.nan, np.nan, 20.0],
+        }
+    )
+    index = ExperimentIndex(df)
+    lab_ids = df['Experiment Info']['Nomad ID']
+
+    groups = index.group_rows('1: Evaporation', lab_ids)
+
+    assert [(j, ids) for j, _, ids in groups] == [
+        (0, ['s_0', 's_1']),
+        (3, ['s_3']),
+        (4, ['s_4']),
+    ]
+    assert [(j, ids) for j, _, ids in groups] == _group_process_rows(
+        df['1: Evaporation'], lab_ids
+    )
+    assert groups[1][1]['Material name'] == 'B'
+    codes = index.encode('1: Evaporation', ['Material name'])
+    assert codes.codes.tolist() == [0, 0, 1, 2, 0]
+    assert codes.empty.tolist() == [False, True, False]
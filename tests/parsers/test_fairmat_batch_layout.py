@@ -0,0 +1,41 @@
+from test_pv_plugin.parsers.fairmat_batch_layout import (
+    ProcessMapper,
+    compile_layout_plan,
+)
+
+
+def _cleaning(*args):
+    pass
+
+
+def _evaporation(*args):
+    pass
+
+
+MAPPERS = (
+    ProcessMapper('Cleaning', _cleaning, False),
+    ProcessMapper('Evaporation', _evaporation, True, typed_parameters=True),
+)
+
+
+def test_compile_layout_plan():
+    header = (
+        ('Experiment Info', 'Nomad ID'),
+        ('1: Cleaning O2-Plasma', 'Solvent 1'),
+        ('1: Cleaning O2-Plasma', 'Time 1 [s]'),
+        ('2: Co-Evaporation', 'Material name'),
+        ('3: Unknown', 'Notes'),
+    )
+
+    plan = compile_layout_plan(header, MAPPERS)
+
+    assert [(s.index, s.group) for s in plan] == [
+        (1, '1: Cleaning O2-Plasma'),
+        (2, '2: Co-Evaporation'),
+        (3, '3: Unknown'),
+    ]
+    assert plan[0].columns == ('Solvent 1', 'Time 1 [s]')
+    assert plan[0].mappers == (_cleaning,) and plan[0].material_mappers == ()
+    assert plan[1].mappers == () and plan[1].material_mappers == (_evaporation,)
+    assert not plan[0].typed_parameters and plan[1].typed_parameters
+    assert compile_layout_plan(header, MAPPERS) is plan
@@ -0,0 +1,118 @@
+import json
+import os
+
+import openpyxl
+import pytest
+from nomad.client import parse
+
+from test_pv_plugin.parsers import fairmat_archive_writer, fairmat_batch_parser
+
+EXPERIMENT_FILE = os.path.join('tests', 'data', '20250114_experiment_file.xlsx')
+
+
+def _experiment_file(tmp_path, change=None):
+    """Copies the test workbook with formulas replaced by their values."""
+    workbook = openpyxl.load_workbook(EXPERIMENT_FILE, data_only=True)
+    if change:
+        change(workbook)
+    file_name = os.path.join(tmp_path, 'experiment.xlsx')
+    workbook.save(file_name)
+    return file_name
+
+
+@pytest.fixture
+def written(monkeypatch):
+    written = []
+    create_archive = fairmat_archive_writer.create_archive
+
+    def write(entity, archive, file_name):
+        written.append(file_name)
+        create_archive(entity, archive, file_name)
+
+    monkeypatch.setattr(fairmat_archive_writer, 'create_archive', write)
+    return written
+
+
+def test_incremental_parse(tmp_path, monkeypatch, written):
+    monkeypatch.setattr(fairmat_batch_parser.configuration, 'incremental', True)
+    file_name = _experiment_file(tmp_path)
+
+    first = parse(file_name)[0]
+    assert len(written) == len(first.data.processed_archive) == 27
+    assert os.path.exists(f'{file_name}.manifest.json')
+
+    written.clear()
+    second = parse(file_name)[0]
+    assert written == []
+    assert len(second.data.processed_archive) == 27
+
+    def change_variation(workbook):
+        workbook.active['G3'] = 'B'
+
+    _experiment_file(tmp_path, change_variation)
+    third = parse(file_name)[0]
+    assert written == ['hzb_TestP_AA_1_c-1.archive.json']
+    assert len(third.data.processed_archive) == 27
+
+
+def test_parse_without_manifest(tmp_path, written):
+    file_name = _experiment_file(tmp_path)
+
+    parse(file_name)
+    parse(file_name)
+
+    assert len(written) == 2 * 27
+    assert not os.path.exists(f'{file_name}.manifest.json')
+
+
+def test_sheet_name_prefixes():
+    assert fairmat_batch_parser.sheet_name_prefixes(['Sheet', 'Run 2', 'a/b']) == [
+        '',
+        'Run_2_',
+        'a_b_',
+    ]
+
+
+def test_parse_sheets(tmp_path):
+    def add_sheet(workbook):
+        workbook.copy_worksheet(workbook.active).title = 'Run 2'
+
+    file_name = _experiment_file(tmp_path, add_sheet)
+
+    archive = parse(file_name)[0]
+
+    refs = [str(ref) for ref in archive.data.processed_archive]
+    assert len(refs) == 2 * 27
+    second = [ref for ref in refs if 'Run_2_' in ref]
+    assert len(second) == 27
+    assert any('Run_2_hzb_TestP_AA_1_c-1.archive.json' in ref for ref in second)
+    assert os.path.exists(os.path.join(tmp_path, 'Run_2_hzb_TestP_AA_1.archive.json'))
+
+
+def _child_archives(directory):
+    archives = {}
+    for file_name in os.listdir(directory):
+        if file_name.endswith('.archive.json'):
+            with open(os.path.join(directory, file_name)) as f:
+                archives[file_name] = json.load(f)
+    return archives
+
+
+def test_streaming_parse(tmp_path, monkeypatch):
+    frame_path = tmp_path / 'frame'
+    streaming_path = tmp_path / 'streaming'
+    frame_path.mkdir()
+    streaming_path.mkdir()
+
+    frame = parse(_experiment_file(frame_path))[0]
+    monkeypatch.setattr(fairmat_batch_parser.configuration, 'streaming', True)
+    streaming = parse(_experiment_file(streaming_path))[0]
+
+    assert sorted(map(str, streaming.data.processed_archive)) == sorted(
+        map(str, frame.data.processed_archive)
+    )
+    frame_archives = _child_archives(frame_path)
+    assert len(frame_archives) == 27
+    assert _child_archives(streaming_path) == frame_archives
+    sample = frame_archives['hzb_TestP_AA_1_c-1.archive.json']['data']
+    assert len(sample['process_history']) == 9
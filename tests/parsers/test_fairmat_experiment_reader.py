@@ -0,0 +1,100 @@
+import os
+import sys
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from test_pv_plugin.parsers.fairmat_experiment_reader import (
+    FrameCache,
+    experiment_sheets,
+    frame_cache,
+    is_experiment_file,
+    read_experiment_frame,
+    read_header,
+    read_parquet_header,
+    read_xlsx_header,
+)
+
+
+def test_read_xlsx_header():
+    file_name = os.path.join('tests', 'data', '20250114_experiment_file.xlsx')
+    header = read_xlsx_header(file_name)
+
+    assert header[0] == ('Experiment Info', 'Date')
+    assert ('Experiment Info', 'Nomad ID') in header
+    assert ('9: Generic Process', 'Notes') in header
+    assert is_experiment_file(file_name)
+    assert not is_experiment_file(os.path.join('tests', 'data', 'example.out'))
+
+
+def test_read_experiment_frame_is_cached():
+    file_name = os.path.join('tests', 'data', '20250114_experiment_file.xlsx')
+    frame_cache.clear()
+
+    df = read_experiment_frame(file_name)
+
+    assert read_experiment_frame(file_name) is df
+    assert list(df.columns) == read_xlsx_header(file_name)
+
+
+def test_frame_cache_eviction():
+    df = pd.DataFrame({'a': range(100)})
+    size = int(df.memory_usage(deep=True).sum())
+    cache = FrameCache(max_bytes=2 * size)
+
+    cache.put('a', df)
+    cache.put('b', df.copy())
+    cache.get('a')
+    cache.put('c', df.copy())
+
+    assert cache.get('a') is df
+    assert cache.get('b') is None
+    assert cache.get('c') is not None
+
+
+def test_read_csv_experiment_file(tmp_path):
+    file_name = os.path.join('tests', 'data', '20250114_experiment_file.xlsx')
+    df = read_experiment_frame(file_name)
+    csv_file = os.path.join(tmp_path, 'experiment.csv')
+    df.to_csv(csv_file, index=False)
+
+    assert read_header(csv_file) == list(df.columns)
+    assert is_experiment_file(csv_file)
+    assert read_experiment_frame(csv_file).equals(df)
+
+
+def test_read_parquet_experiment_file(tmp_path):
+    pytest.importorskip('pyarrow')
+    file_name = os.path.join('tests', 'data', '20250114_experiment_file.xlsx')
+    df = read_experiment_frame(file_name)
+    parquet_file = os.path.join(tmp_path, 'experiment.parquet')
+    df.to_parquet(parquet_file, index=False)
+
+    assert read_header(parquet_file) == list(df.columns)
+    assert is_experiment_file(parquet_file)
+    assert read_experiment_frame(parquet_file).equals(df)
+
+
+def test_read_parquet_without_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'pyarrow.parquet', None)
+    parquet_file = os.path.join(tmp_path, 'experiment.parquet')
+
+    with pytest.raises(ImportError, match=r'test-pv-plugin\[parquet\]'):
+        read_parquet_header(parquet_file)
+    with pytest.raises(ImportError, match='requires pyarrow'):
+        read_experiment_frame(parquet_file, key='experiment')
+    assert not is_experiment_file(parquet_file)
+
+
+def test_experiment_sheets(tmp_path):
+    file_name = os.path.join('tests', 'data', '20250114_experiment_file.xlsx')
+    wb = openpyxl.load_workbook(file_name)
+    wb.copy_worksheet(wb.worksheets[0]).title = 'Run 2'
+    wb.create_sheet('Notes')['A1'] = 'not an experiment'
+    multi_sheet_file = os.path.join(tmp_path, 'experiments.xlsx')
+    wb.save(multi_sheet_file)
+
+    assert experiment_sheets(multi_sheet_file) == [wb.sheetnames[0], 'Run 2']
+    assert read_xlsx_header(multi_sheet_file, sheet_name='Run 2') == read_xlsx_header(
+        file_name)
@@ -0,0 +1,95 @@
+import json
+import os
+
+import pytest
+
+from test_pv_plugin.parsers.fairmat_measurement_parser import (
+    bundled_files,
+    find_duplicate_measurement,
+    is_bundled,
+    map_measurement_file,
+    read_bundle,
+)
+from test_pv_plugin.schema_packages.fairmat_raw_file import file_hash
+from test_pv_plugin.schema_packages.fairmat_sample_index import lab_id_from_file_name
+
+
+def test_map_measurement_file():
+    entry, search_id = map_measurement_file(
+        os.path.join('data', 'hzb_A_1_c-1.light.jv.txt'), 'abc')
+
+    assert search_id == 'hzb_A_1_c-1'
+    assert 'JV' in str(type(entry))
+    assert entry.name == 'hzb_A_1_c-1 light'
+    assert entry.data_file == os.path.join('data', 'hzb_A_1_c-1.light.jv.txt')
+    assert entry.data_file_hash == 'abc'
+
+
+def test_map_bundled_measurement_file():
+    file_name = os.path.join('run.2', 'sub', 'hzb_A_1_c-1.light.jv.txt')
+    entry, search_id = map_measurement_file(file_name)
+
+    assert search_id == 'hzb_A_1_c-1'
+    assert lab_id_from_file_name(entry.data_file) == search_id
+
+
+def test_bundled_files(tmp_path):
+    assert bundled_files(str(tmp_path)) == set()
+
+    with open(os.path.join(tmp_path, 'run.measurements.json'), 'w') as f:
+        json.dump({'files': ['a.jv.txt', 'sub/b.eqe.txt']}, f)
+
+    assert bundled_files(str(tmp_path)) == {
+        os.path.join(tmp_path, 'a.jv.txt'),
+        os.path.join(tmp_path, 'sub', 'b.eqe.txt'),
+    }
+    os.makedirs(os.path.join(tmp_path, 'sub'))
+    assert is_bundled(os.path.join(tmp_path, 'sub', 'b.eqe.txt'))
+    assert not is_bundled(os.path.join(tmp_path, 'sub', 'a.jv.txt'))
+
+
+@pytest.mark.parametrize(
+    'manifest',
+    [{'files': 'a.jv.txt'}, {'files': [1]}, {'files': ['../a.jv.txt']}, ['a.jv.txt']],
+)
+def test_read_bundle_invalid(tmp_path, manifest):
+    file_name = os.path.join(tmp_path, 'run.measurements.json')
+    with open(file_name, 'w') as f:
+        json.dump(manifest, f)
+
+    with pytest.raises(ValueError):
+        read_bundle(file_name)
+
+
+def test_find_duplicate_measurement(tmp_path):
+    os.makedirs(os.path.join(tmp_path, 'sub'))
+    for file_name, content in [
+        ('s_1.b.jv.txt', 'a'),
+        ('sub/s_1.a.jv.txt', 'a'),
+        ('s_1.c.jv.txt', 'b'),
+        ('s_2.a.jv.txt', 'a'),
+    ]:
+        with open(os.path.join(tmp_path, file_name), 'w') as f:
+            f.write(content)
+    root = str(tmp_path)
+    content_hash = file_hash(os.path.join(root, 's_1.b.jv.txt'))
+
+    assert find_duplicate_measurement(root, 's_1.b.jv.txt', 's_1', content_hash) is None
+    assert (
+        find_duplicate_measurement(root, 'sub/s_1.a.jv.txt', 's_1', content_hash)
+        == 's_1.b.jv.txt'
+    )
+    assert find_duplicate_measurement(root, 's_2.a.jv.txt', 's_2', content_hash) is None
+    other_hash = file_hash(os.path.join(root, 's_1.c.jv.txt'))
+    assert find_duplicate_measurement(root, 's_1.c.jv.txt', 's_1', other_hash) is None
+
+    # files added later are found
+    with open(os.path.join(tmp_path, 's_1.a.jv.txt'), 'w') as f:
+        f.write('a')
+    assert (
+        find_duplicate_measurement(root, 's_1.a.jv.txt', 's_1', content_hash) is None
+    )
+    assert (
+        find_duplicate_measurement(root, 's_1.b.jv.txt', 's_1', content_hash)
+        == 's_1.a.jv.txt'
+    )
@@ -0,0 +1,17 @@
+from test_pv_plugin.parsers.fairmat_parse_timings import StageTimings
+
+
+def test_stage_timings():
+    timings = StageTimings()
+    with timings.stage('grouping', count=2):
+        pass
+    with timings.stage('grouping', count=3):
+        pass
+    items = list(timings.iterate('streaming', range(4)))
+
+    stages = timings.as_dict()
+    assert items == [0, 1, 2, 3]
+    assert stages['grouping']['count'] == 5
+    assert stages['streaming']['count'] == 4
+    assert stages['grouping']['wall_time'] >= 0
+    assert stages['streaming']['cpu_time'] >= 0
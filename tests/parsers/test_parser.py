@@ -28,6 +28,8 @@ def test_batch_parser(monkeypatch):  # noqa: PLR0915
             if 'Sample' in str(type(m.data)):
                 assert m.data.description == 'A'
                 assert m.data.number_of_junctions == 1
+            positions = [step.position for step in m.data.process_history]
+            assert positions == list(range(1, 10))
         elif 'Substrate' in str(type(m.data)):
             assert m.data.solar_cell_area == 10 * ureg('cm**2')
             assert m.data.pixel_area == 0.16 * ureg('cm**2')
@@ -198,3 +200,17 @@ def test_batch_parser(monkeypatch):  # noqa: PLR0915
 
     assert count_samples_batches == 17
     delete_json()
+
+
+def test_preview_experiment_file():
+    from test_pv_plugin.parsers.fairmat_batch_parser import preview_experiment_file
+
+    before = set(os.listdir(os.path.join('tests', 'data')))
+    preview = preview_experiment_file(
+        os.path.join('tests', 'data', '20250114_experiment_file.xlsx'))
+
+    assert sum(preview['counts'].values()) == 27
+    assert len(preview['entries']) == 27
+    assert {e['positon_in_experimental_plan'] for e in preview['entries']} >= set(
+        range(1, 10))
+    assert set(os.listdir(os.path.join('tests', 'data'))) == before
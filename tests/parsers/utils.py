@@ -8,12 +8,7 @@ def set_monkey_patch(monkeypatch):
         return None
 
     monkeypatch.setattr(
-        'test_pv_plugin.parsers.fairmat_measurement_parser.set_sample_reference',
-        mockreturn_search,
-    )
-
-    monkeypatch.setattr(
-        'test_pv_plugin.schema_packages.fairmat_package.set_sample_reference',
+        'test_pv_plugin.schema_packages.fairmat_sample_index.set_sample_reference',
         mockreturn_search,
     )
 
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from test_pv_plugin.schema_packages.file_parser.eqe_parser import (
+    HC_EV_NM,
+    am15g_photon_flux,
+    eqe_figures_of_merit,
+    read_eqe,
+    trapezoid,
+)
+
+
+def _eqe(photon_energy, bandgap):
+    return 0.8 / (1 + np.exp(-(photon_energy - bandgap) / 0.02))
+
+
+def _eqe_file():
+    wavelength = np.arange(300, 1000.1, 2)
+    lines = [
+        'Sample: hzb_A_1_c-1',
+        'Wavelength (nm)\tDevice 1 EQE (%)\tDevice 2 EQE (%)',
+    ]
+    for wl in wavelength:
+        energy = HC_EV_NM / wl
+        lines.append(f'{wl}\t{_eqe(energy, 1.6) * 100}\t{_eqe(energy, 1.7) * 100}')
+    return '\n'.join(lines)
+
+
+def test_read_eqe():
+    eqe = read_eqe(_eqe_file())
+
+    assert eqe['header']['Sample'] == 'hzb_A_1_c-1'
+    assert eqe['names'] == ['Device 1 EQE (%)', 'Device 2 EQE (%)']
+    assert eqe['eqe'].shape == eqe['photon_energy'].shape == (351, 2)
+    assert eqe['wavelength'][0] == pytest.approx([300, 300])
+    assert eqe['photon_energy'][0] == pytest.approx(HC_EV_NM / 300)
+    assert eqe['eqe'].max() == pytest.approx(0.8, rel=1e-3)
+
+
+def test_eqe_figures_of_merit():
+    eqe = read_eqe(_eqe_file())
+    figures = eqe_figures_of_merit(eqe['photon_energy'], eqe['eqe'])
+
+    wavelength, flux = am15g_photon_flux()
+    measured = (wavelength >= 300) & (wavelength <= 1000)
+    jsc = [
+        trapezoid(
+            _eqe(HC_EV_NM / wavelength[measured], bandgap) * flux[measured],
+            wavelength[measured],
+        )
+        * 1.602176634e-20
+        for bandgap in (1.6, 1.7)
+    ]
+
+    assert figures['integrated_jsc'] == pytest.approx(jsc, rel=1e-2)
+    assert figures['bandgap_eqe'] == pytest.approx([1.6, 1.7], abs=0.01)
@@ -0,0 +1,58 @@
+import io
+
+import h5py
+import numpy as np
+
+from test_pv_plugin.schema_packages import fairmat_hdf5
+from test_pv_plugin.schema_packages.fairmat_hdf5 import (
+    column_groups,
+    plot_points,
+    use_hdf5,
+    write_nxdata,
+)
+
+
+def test_use_hdf5(monkeypatch):
+    arrays = np.zeros(100), np.zeros(100)
+
+    assert not use_hdf5(*arrays)
+
+    monkeypatch.setattr(fairmat_hdf5.configuration, 'hdf5_arrays', True)
+    monkeypatch.setattr(fairmat_hdf5.configuration, 'hdf5_min_values', 200)
+    assert use_hdf5(*arrays)
+    assert not use_hdf5(arrays[0])
+
+
+def test_write_nxdata():
+    time = np.arange(1000.0)
+    f = io.BytesIO()
+    write_nxdata(f, dict(mppt=dict(time=time, power_density=time * 2)))
+
+    with h5py.File(f, 'r') as h5:
+        group = h5['mppt']
+        assert dict(group.attrs) == dict(
+            NX_class='NXdata', axes='time', signal='power_density'
+        )
+        assert group['time'].attrs['units'] == 's'
+        assert np.array_equal(group['power_density'][()], time * 2)
+
+
+def test_column_groups():
+    voltage = np.arange(6.0).reshape(3, 2)
+    groups = column_groups(['a/b', 'a/b'], voltage=voltage, current_density=-voltage)
+
+    assert list(groups) == ['0_a_b', '1_a_b']
+    assert np.array_equal(groups['1_a_b']['voltage'], voltage[:, 1])
+    assert list(column_groups(['', ''], voltage=voltage)) == ['0_', '1_']
+
+
+def test_plot_points():
+    x = np.linspace(0, 1, 1000)
+    y = x**2
+    y[10] = np.nan
+
+    kept = plot_points(x, y, 100)
+
+    assert len(kept) == 100
+    assert kept[0] == 0 and kept[-1] == 999
+    assert 10 not in kept
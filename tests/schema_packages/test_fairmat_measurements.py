@@ -0,0 +1,231 @@
+import os
+
+import numpy as np
+import pytest
+from nomad.datamodel import EntryArchive, EntryMetadata
+from nomad.datamodel.context import ClientContext
+from nomad.utils import get_logger
+
+from test_pv_plugin.schema_packages import (
+    fairmat_hdf5,
+    fairmat_normalization_cache,
+    fairmat_package,
+)
+from test_pv_plugin.schema_packages.fairmat_normalization_cache import cache_file_name
+from test_pv_plugin.schema_packages.fairmat_package import (
+    fairmat_EQEmeasurement,
+    fairmat_JVmeasurement,
+    fairmat_SimpleMPPTracking,
+)
+from test_pv_plugin.schema_packages.file_parser.eqe_parser import HC_EV_NM
+
+JV_FILE = '\n'.join(
+    [
+        'Intensity [mW/cm^2]: 100',
+        'Voltage (V)\tCell 1',
+        *(f'{v}\t{-(20 - 30 * v**4)}' for v in np.linspace(-0.2, 1.2, 141)),
+    ]
+)
+
+MPPT_FILE = '\n'.join(
+    [
+        'Sample: hzb_A_1_c-1',
+        'Time (s)\tVoltage (V)\tCurrent density (mA/cm^2)',
+        *(f'{t}\t0.9\t{20 * np.exp(-t / 600) / 0.9}' for t in range(0, 1200, 10)),
+    ]
+)
+
+EQE_FILE = '\n'.join(
+    [
+        'Sample: hzb_A_1_c-1',
+        'Wavelength (nm)\tDevice 1 EQE (%)',
+        *(
+            f'{wl}\t{80 / (1 + np.exp(-(HC_EV_NM / wl - 1.6) / 0.02))}'
+            for wl in np.arange(300, 1000.1, 2)
+        ),
+    ]
+)
+
+
+def _normalize(tmp_path, entry, data):
+    file_name = os.path.join(tmp_path, entry.data_file)
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    with open(file_name, 'w') as f:
+        f.write(data)
+    archive = EntryArchive(
+        data=entry,
+        metadata=EntryMetadata(upload_id='upload'),
+        m_context=ClientContext(local_dir=str(tmp_path)),
+    )
+    entry.normalize(archive, get_logger(__name__))
+    return archive
+
+
+@pytest.fixture
+def searched(monkeypatch):
+    searched = []
+    monkeypatch.setattr(
+        fairmat_package,
+        'set_indexed_sample_reference',
+        lambda archive, entry, search_id, *args, **kwargs: searched.append(search_id),
+    )
+    return searched
+
+
+def test_measurement_in_subdirectory(tmp_path, searched):
+    data_file = os.path.join('run.2', 'sub', 'hzb_A_1_c-1.light.jv.txt')
+
+    archive = _normalize(tmp_path, fairmat_JVmeasurement(data_file=data_file), JV_FILE)
+
+    assert searched == ['hzb_A_1_c-1']
+    assert len(archive.data.jv_curve) == 1
+
+
+def test_normalize_jv(tmp_path, searched):
+    archive = _normalize(
+        tmp_path, fairmat_JVmeasurement(data_file='hzb_A_1_c-1.light.jv.txt'), JV_FILE
+    )
+
+    curve = archive.data.jv_curve[0]
+    assert curve.cell_name == 'Cell 1'
+    assert curve.short_circuit_current_density.magnitude == pytest.approx(20, rel=1e-3)
+    assert curve.efficiency > 0
+
+
+def test_normalize_mppt(tmp_path, searched):
+    archive = _normalize(
+        tmp_path,
+        fairmat_SimpleMPPTracking(data_file='hzb_A_1_c-1.mppt.txt'),
+        MPPT_FILE,
+    )
+
+    mppt = archive.data
+    assert searched == ['hzb_A_1_c-1']
+    assert len(mppt.time) == 120
+    assert mppt.power_density[0].magnitude == pytest.approx(20)
+    assert mppt.t80.to('s').magnitude == pytest.approx(600 * np.log(1 / 0.8), abs=10)
+    assert len(mppt.time_plot) == len(mppt.power_density_plot) > 0
+
+
+def test_normalize_eqe(tmp_path, searched):
+    archive = _normalize(
+        tmp_path, fairmat_EQEmeasurement(data_file='hzb_A_1_c-1.eqe.txt'), EQE_FILE
+    )
+
+    eqe_data = archive.data.eqe_data
+    assert len(eqe_data) == 1
+    assert len(eqe_data[0].eqe_array) == 351
+    assert eqe_data[0].bandgap_eqe.magnitude == pytest.approx(1.6, abs=0.05)
+    assert eqe_data[0].integrated_jsc.magnitude > 0
+
+
+@pytest.fixture
+def reads(monkeypatch, searched):
+    monkeypatch.setattr(
+        fairmat_normalization_cache.configuration, 'normalization_cache', True
+    )
+    reads = []
+
+    def read_jv(text):
+        reads.append(text)
+        return fairmat_package.read_jv.__wrapped__(text)
+
+    read_jv.__wrapped__ = fairmat_package.read_jv
+    monkeypatch.setattr(fairmat_package, 'read_jv', read_jv)
+    return reads
+
+
+def _jv_measurement():
+    return fairmat_JVmeasurement(data_file='hzb_A_1_c-1.light.jv.txt')
+
+
+def test_normalization_cache(tmp_path, reads):
+    first = _normalize(tmp_path, _jv_measurement(), JV_FILE).data
+    assert len(reads) == 1
+    assert os.path.exists(os.path.join(tmp_path, cache_file_name(first.data_file)))
+
+    # unchanged file
+    second = _normalize(tmp_path, _jv_measurement(), JV_FILE).data
+    assert len(reads) == 1
+    assert second.normalization_fingerprint == first.normalization_fingerprint
+    assert second.data_file_hash == first.data_file_hash
+    assert second.jv_curve[0].efficiency == first.jv_curve[0].efficiency
+
+    # same content written again, only hashed
+    os.utime(os.path.join(tmp_path, first.data_file), ns=(0, 0))
+    _normalize(tmp_path, _jv_measurement(), JV_FILE)
+    assert len(reads) == 1
+
+    # new content
+    changed = _normalize(tmp_path, _jv_measurement(), JV_FILE.replace(': 100', ': 50'))
+    assert len(reads) == 2
+    assert changed.data.data_file_hash != first.data_file_hash
+    efficiency = changed.data.jv_curve[0].efficiency / first.jv_curve[0].efficiency
+    assert efficiency == pytest.approx(2)
+
+
+def test_normalization_cache_parser_version(tmp_path, reads, monkeypatch):
+    _normalize(tmp_path, _jv_measurement(), JV_FILE)
+    monkeypatch.setattr(fairmat_package, 'JV_PARSER_VERSION', 2)
+
+    _normalize(tmp_path, _jv_measurement(), JV_FILE)
+
+    assert len(reads) == 2
+
+
+def test_normalization_cache_write_failed(tmp_path, reads, monkeypatch):
+    def write_normalization_cache(*args):
+        raise OSError('read-only upload')
+
+    monkeypatch.setattr(
+        fairmat_package, 'write_normalization_cache', write_normalization_cache
+    )
+
+    archive = _normalize(tmp_path, _jv_measurement(), JV_FILE)
+    _normalize(tmp_path, _jv_measurement(), JV_FILE)
+
+    assert len(archive.data.jv_curve) == 1
+    assert len(reads) == 2
+
+
+@pytest.fixture
+def hdf5_write_failed(monkeypatch):
+    monkeypatch.setattr(fairmat_hdf5.configuration, 'hdf5_arrays', True)
+    monkeypatch.setattr(fairmat_hdf5.configuration, 'hdf5_min_values', 1)
+
+    def write_hdf5_arrays(*args):
+        raise OSError('read-only upload')
+
+    monkeypatch.setattr(fairmat_package, 'write_hdf5_arrays', write_hdf5_arrays)
+
+
+@pytest.mark.parametrize(
+    'entry, data, arrays',
+    [
+        pytest.param(
+            fairmat_JVmeasurement(data_file='hzb_A_1_c-1.light.jv.txt'),
+            JV_FILE,
+            lambda m: m.jv_curve[0].voltage,
+            id='jv',
+        ),
+        pytest.param(
+            fairmat_SimpleMPPTracking(data_file='hzb_A_1_c-1.mppt.txt'),
+            MPPT_FILE,
+            lambda m: m.time,
+            id='mppt',
+        ),
+        pytest.param(
+            fairmat_EQEmeasurement(data_file='hzb_A_1_c-1.eqe.txt'),
+            EQE_FILE,
+            lambda m: m.eqe_data[0].eqe_array,
+            id='eqe',
+        ),
+    ],
+)
+@pytest.mark.usefixtures('searched', 'hdf5_write_failed')
+def test_hdf5_write_failed(tmp_path, entry, data, arrays):
+    measurement = _normalize(tmp_path, entry, data).data
+
+    assert measurement.hdf5_data is None
+    # all rows after the header and names lines
+    assert len(arrays(measurement)) == len(data.splitlines()) - 2
@@ -0,0 +1,74 @@
+import os
+from types import SimpleNamespace
+
+from test_pv_plugin.schema_packages import fairmat_normalization_cache
+from test_pv_plugin.schema_packages.fairmat_normalization_cache import (
+    normalization_fingerprint,
+    raw_file_stat,
+    read_normalization_cache,
+    write_normalization_cache,
+)
+
+
+class RawFileContext:
+    def __init__(self, directory):
+        self.directory = directory
+
+    def raw_path_exists(self, path):
+        return os.path.exists(os.path.join(self.directory, path))
+
+    def raw_file(self, path, mode='r'):
+        return open(os.path.join(self.directory, path), mode)
+
+
+class Measurement:
+    data_file = 'hzb_A_1_c-1.jv.txt'
+    data_file_hash = 'abc'
+
+    def m_to_dict(self):
+        return dict(data_file=self.data_file, jv_curve=[dict(cell_name='Cell 1')])
+
+
+def test_normalization_fingerprint():
+    settings = dict(hdf5_arrays=False)
+    fingerprint = normalization_fingerprint('abc', 1, settings)
+
+    assert fingerprint == normalization_fingerprint('abc', 1, dict(settings))
+    assert fingerprint != normalization_fingerprint('abd', 1, settings)
+    assert fingerprint != normalization_fingerprint('abc', 2, settings)
+    assert fingerprint != normalization_fingerprint('abc', 1, dict(hdf5_arrays=True))
+
+
+def test_raw_file_stat(tmp_path):
+    archive = SimpleNamespace(m_context=RawFileContext(tmp_path))
+    path = tmp_path / Measurement.data_file
+    path.write_text('V\tJ\n0\t1\n')
+
+    stat = raw_file_stat(archive, Measurement.data_file)
+    assert stat == [path.stat().st_size, path.stat().st_mtime_ns]
+
+    os.utime(path, ns=(0, 0))
+    assert raw_file_stat(archive, Measurement.data_file) != stat
+    assert raw_file_stat(archive, 'missing.txt') is None
+
+
+def test_normalization_cache(tmp_path, monkeypatch):
+    archive = SimpleNamespace(m_context=RawFileContext(tmp_path))
+    fingerprint = normalization_fingerprint('abc', 1)
+
+    write_normalization_cache(archive, Measurement(), fingerprint, ('jv_curve',))
+    assert not os.listdir(tmp_path)
+
+    monkeypatch.setattr(fairmat_normalization_cache.configuration, 'normalization_cache', True)
+    assert read_normalization_cache(archive, Measurement.data_file) is None
+
+    write_normalization_cache(
+        archive, Measurement(), fingerprint, ('jv_curve', 'hdf5_data'), [12, 34]
+    )
+
+    assert read_normalization_cache(archive, Measurement.data_file) == dict(
+        fingerprint=fingerprint,
+        data_file_hash='abc',
+        stat=[12, 34],
+        values=dict(jv_curve=[dict(cell_name='Cell 1')]),
+    )
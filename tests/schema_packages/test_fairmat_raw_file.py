@@ -0,0 +1,51 @@
+import io
+import os
+
+from test_pv_plugin.schema_packages.fairmat_raw_file import (
+    RawDataFile,
+    detect_encoding,
+    file_hash,
+)
+
+
+def test_raw_data_file(tmp_path):
+    content = 'Voltage (V)\tCurrent (mA/cm^2)\n0.0\t-20.1\n'
+    file_name = os.path.join(tmp_path, 'hzb_A_1_c-1.jv.txt')
+    with open(file_name, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+    with RawDataFile(open(file_name, 'rb')) as raw_file:
+        assert raw_file.text == content
+        assert raw_file.data_file_hash == file_hash(file_name)
+        assert list(raw_file.text_stream()) == content.splitlines(keepends=True)
+
+    with RawDataFile(io.BytesIO(content.encode())) as raw_file:
+        assert raw_file.text == content
+        assert raw_file.data_file_hash == file_hash(file_name)
+
+
+def test_empty_raw_data_file(tmp_path):
+    file_name = os.path.join(tmp_path, 'empty.jv.txt')
+    open(file_name, 'w').close()
+
+    with RawDataFile(open(file_name, 'rb')) as raw_file:
+        assert raw_file.data_file_hash == file_hash(file_name)
+
+
+def test_detect_encoding():
+    text = 'Wavelength (nm)\tEQE\n300\t0.1\n'
+
+    assert detect_encoding(text.encode('utf-8')) == 'utf-8'
+    assert detect_encoding(text.encode('utf-8-sig')) == 'utf-8-sig'
+    assert detect_encoding(text.encode('utf-16')) == 'utf-16'
+    assert detect_encoding(text.encode('utf-32')) == 'utf-32'
+    # a multi-byte character cut at the end of the checked prefix
+    assert detect_encoding('aµ'.encode(), prefix_bytes=2) == 'utf-8'
+
+
+def test_raw_data_file_beyond_utf8_prefix():
+    content = 'Temperature: 25 °C\n' * 20
+    raw_file = RawDataFile(io.BytesIO(content.encode('latin-1')))
+    raw_file.encoding = 'utf-8'
+
+    assert raw_file.text == content
@@ -0,0 +1,86 @@
+from nomad.datamodel import EntryArchive, EntryMetadata
+
+from test_pv_plugin.schema_packages import fairmat_sample_index
+from test_pv_plugin.schema_packages.fairmat_package import fairmat_JVmeasurement
+from test_pv_plugin.schema_packages.fairmat_sample_index import (
+    SampleIndex,
+    set_indexed_sample_reference,
+)
+
+
+def test_sample_index():
+    searches = []
+
+    def search(archive, upload_id):
+        searches.append(upload_id)
+        return [
+            dict(
+                upload_id=upload_id,
+                entry_id='a',
+                entry_type='fairmat_Sample',
+                results=dict(eln=dict(lab_ids=['s_1'])),
+            ),
+            dict(
+                upload_id=upload_id,
+                entry_id='b',
+                entry_type='fairmat_Sample',
+                results=dict(eln=dict(lab_ids=['s_2'])),
+            ),
+            dict(
+                upload_id=upload_id,
+                entry_id='c',
+                entry_type='fairmat_Sample',
+                results=dict(eln=dict(lab_ids=['s_2'])),
+            ),
+            dict(
+                upload_id=upload_id,
+                entry_id='d',
+                entry_type='fairmat_JVmeasurement',
+                results=dict(eln=dict(lab_ids=['s_3'])),
+            ),
+        ]
+
+    index = SampleIndex(ttl=60, max_uploads=1, search=search)
+
+    assert index.get(None, 'u1', 's_1') == ('u1', 'a')
+    assert index.get(None, 'u1', 's_2') is None
+    assert index.get(None, 'u1', 's_3') is None
+    assert searches == ['u1']
+
+    index.get(None, 'u2', 's_1')
+    index.get(None, 'u1', 's_1')
+    assert searches == ['u1', 'u2', 'u1']
+
+    index.ttl = -1
+    index.get(None, 'u1', 's_1')
+    assert searches == ['u1', 'u2', 'u1', 'u1']
+
+
+def test_sample_index_builds_without_lock():
+    def search(archive, upload_id):
+        assert not index._lock.locked()
+        return []
+
+    index = SampleIndex(search=search)
+
+    assert index.get(None, 'u1', 's_1') is None
+
+
+def test_set_indexed_sample_reference_fallback(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        fairmat_sample_index,
+        'set_sample_reference',
+        lambda archive, entry, search_id, **kwargs: calls.append((search_id, kwargs)),
+    )
+    monkeypatch.setattr(
+        fairmat_sample_index, 'sample_index', SampleIndex(search=lambda *args: [])
+    )
+    archive = EntryArchive(metadata=EntryMetadata(upload_id='u1'))
+    entry = fairmat_JVmeasurement()
+
+    set_indexed_sample_reference(archive, entry, 's_1')
+    set_indexed_sample_reference(archive, entry, 's_2', upload_id='u1')
+
+    assert calls == [('s_1', {}), ('s_2', {'upload_id': 'u1'})]
+    assert not entry.samples
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from test_pv_plugin.schema_packages.file_parser.jv_parser import (
+    jv_figures_of_merit,
+    read_jv,
+)
+
+
+def _diode(voltage, jsc, rsh=1000.0):
+    return jsc - 1e-9 * (np.exp(voltage / (1.5 * 0.02569)) - 1) - voltage / rsh * 1000
+
+
+def _jv_file():
+    voltage = np.linspace(-0.2, 1.2, 141)
+    lines = [
+        'Sample: hzb_A_1_c-1',
+        'Intensity [mW/cm^2]: 50',
+        'Voltage (V)\tCell 1 forward\tCell 1 reverse\tVoltage (V)\tCell 2',
+    ]
+    for v, v_reverse in zip(voltage, voltage[::-1]):
+        lines.append(
+            f'{v}\t{-_diode(v, 20)}\t{-_diode(v, 18)}\t{v_reverse}\t{-_diode(v_reverse, 22)}'
+        )
+    return '\n'.join(lines)
+
+
+def test_read_jv():
+    jv = read_jv(_jv_file())
+
+    assert jv['header']['Sample'] == 'hzb_A_1_c-1'
+    assert jv['light_intensity'] == 50
+    assert jv['cell_names'] == ['Cell 1 forward', 'Cell 1 reverse', 'Cell 2']
+    assert jv['voltage'].shape == jv['current_density'].shape == (141, 3)
+    assert jv['voltage'][0, 2] == pytest.approx(1.2)
+
+
+def test_jv_figures_of_merit():
+    jv = read_jv(_jv_file())
+    fom = jv_figures_of_merit(jv['voltage'], jv['current_density'], jv['light_intensity'])
+
+    voltage = np.linspace(0, 1.2, 100001)
+    power = voltage * _diode(voltage, 20)
+    voc = voltage[np.argmin(np.abs(_diode(voltage, 20)))]
+
+    assert fom['short_circuit_current_density'] == pytest.approx([20, 18, 22], rel=1e-3)
+    assert fom['open_circuit_voltage'][0] == pytest.approx(voc, abs=1e-3)
+    assert fom['efficiency'][0] == pytest.approx(power.max() / 50 * 100, rel=1e-3)
+    assert fom['fill_factor'][0] == pytest.approx(power.max() / (voc * 20), rel=1e-3)
+    assert fom['shunt_resistance'] == pytest.approx([1000] * 3, rel=1e-2)
+
+
+def test_jv_figures_of_merit_missing_values():
+    jv = read_jv(_jv_file())
+    fom = jv_figures_of_merit(jv['voltage'], jv['current_density'], jv['light_intensity'])
+    current_density = jv['current_density'].copy()
+    current_density[[5, 100], 1] = np.nan
+    current_density[:, 2] = np.nan
+
+    missing = jv_figures_of_merit(jv['voltage'], current_density, jv['light_intensity'])
+    single = jv_figures_of_merit(jv['voltage'][:1], jv['current_density'][:1])
+
+    for name, values in missing.items():
+        assert values[:2] == pytest.approx(fom[name][:2], rel=1e-2), name
+        assert np.isnan(values[2])
+        assert np.isnan(single[name]).all()
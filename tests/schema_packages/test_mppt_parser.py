@@ -0,0 +1,92 @@
+import io
+
+import numpy as np
+import pytest
+
+from test_pv_plugin.schema_packages.file_parser.mppt_parser import lttb, read_mppt
+
+
+def _mppt_file(n=1000):
+    time = np.arange(n) / 60
+    power = 20 * np.exp(-time / 10)
+    power[:10] = np.linspace(18, 20, 10)
+    lines = ['Sample: hzb_A_1_c-1', 'Time (min)\tVoltage (V)\tCurrent density (mA/cm^2)']
+    for t, p in zip(time, power):
+        lines.append(f'{t}\t{0.9}\t{p / 0.9}')
+    return '\n'.join(lines), time * 60, power
+
+
+def test_read_mppt():
+    text, time, power = _mppt_file()
+    mppt = read_mppt(io.StringIO(text))
+    chunked = read_mppt(io.StringIO(text), chunk_rows=7)
+
+    assert mppt['header']['Sample'] == 'hzb_A_1_c-1'
+    assert mppt['time'] == pytest.approx(time)
+    assert mppt['power_density'] == pytest.approx(power)
+    for quantity in ('time', 'voltage', 'current_density', 'power_density'):
+        assert chunked[quantity] == pytest.approx(mppt[quantity])
+
+    peak = power.max()
+    running_peak = np.maximum.accumulate(power)
+    for statistics in (mppt['statistics'], chunked['statistics']):
+        assert statistics.initial_power_density == pytest.approx(18)
+        assert statistics.peak_power_density == pytest.approx(peak)
+        assert statistics.final_power_density == pytest.approx(power[-1])
+        assert statistics.t80 == pytest.approx(time[np.argmax(power < 0.8 * running_peak)])
+        assert statistics.t95 == pytest.approx(time[np.argmax(power < 0.95 * running_peak)])
+
+
+def test_lttb():
+    x = np.arange(10000, dtype=float)
+    y = np.sin(x / 500)
+    y[5000] = 10
+
+    kept = lttb(x, y, 100)
+
+    assert len(kept) == 100
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert np.all(np.diff(kept) > 0)
+    assert 5000 in kept
+    assert len(lttb(x[:50], y[:50], 100)) == 50
+
+
+def test_read_mppt_footer():
+    text, time, power = _mppt_file(100)
+    text += '\t\t\n\nEnd of data\n1\t2\t3\t4'
+
+    for chunk_rows in (7, 1000):
+        mppt = read_mppt(io.StringIO(text), chunk_rows=chunk_rows)
+        assert mppt['power_density'] == pytest.approx(power)
+
+
+def test_read_mppt_empty_chunk():
+    text, time, power = _mppt_file(100)
+
+    mppt = read_mppt(io.StringIO(text + '\n' * 10), chunk_rows=10)
+
+    assert mppt['time'] == pytest.approx(time)
+
+
+def test_mppt_statistics_missing_values():
+    text, time, power = _mppt_file()
+    lines = text.split('\n')
+    lines[7] = f'{time[5] / 60}\tnan\tnan'
+    power = np.delete(power, 5)
+    time = np.delete(time, 5)
+
+    statistics = read_mppt(io.StringIO('\n'.join(lines)), chunk_rows=7)['statistics']
+
+    running_peak = np.maximum.accumulate(power)
+    assert statistics.peak_power_density == pytest.approx(power.max())
+    assert statistics.t80 == pytest.approx(time[np.argmax(power < 0.8 * running_peak)])
+    assert statistics.t95 == pytest.approx(time[np.argmax(power < 0.95 * running_peak)])
+
+
+def test_read_mppt_decimal_comma():
+    text, time, power = _mppt_file(20)
+    text = text.replace('.', ',').replace('\t', ';')
+    mppt = read_mppt(io.StringIO(text), chunk_rows=7)
+
+    assert mppt['time'] == pytest.approx(time)
+    assert mppt['power_density'] == pytest.approx(power)
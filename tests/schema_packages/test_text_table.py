@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from test_pv_plugin.schema_packages.file_parser.text_table import read_table
+
+
+@pytest.mark.parametrize(
+    'lines',
+    [
+        pytest.param(['V\tJ1\tJ2', '0.1\t1\t2', '0.2\t3\t4'], id='plain'),
+        pytest.param(['V\tJ1\tJ2\t', '0.1\t1\t2\t', '0.2\t3\t4\t'], id='trailing'),
+        pytest.param(['V\tJ1\tJ2', '0.1\t1\t2', '0.2\t3\t4', 'End of data'], id='footer'),
+        pytest.param(
+            ['V\tJ1\tJ2', '0.1\t1\t2', '0.2\t3\t4', '', '1\t2', '3\t4'], id='second table'
+        ),
+        pytest.param(['Sample: a', '0.16', 'V\tJ1\tJ2', '0.1\t1\t2', '0.2\t3\t4'], id='number'),
+    ],
+)
+def test_read_table(lines):
+    header, names, data = read_table('\n'.join(lines))
+
+    assert names == ['V', 'J1', 'J2']
+    assert data == pytest.approx(np.array([[0.1, 1, 2], [0.2, 3, 4]]))
+
+
+def test_read_table_header():
+    text = 'Sample: a\nArea [cm^2]\t0.16\n0.16\nV;J\n0.1;1\n'
+    header, names, data = read_table(text)
+
+    assert header == {'Sample': 'a', 'Area [cm^2]': '0.16'}
+    assert names == ['V', 'J']
+    assert data.shape == (1, 2)
+
+
+def test_read_table_without_names():
+    header, names, data = read_table('1 2 3\n4 5 6\n')
+
+    assert names == ['column 0', 'column 1', 'column 2']
+    assert data.shape == (2, 3)
+    with pytest.raises(ValueError):
+        read_table('Sample: a\nV\tJ\n')
+
+
+def test_read_table_decimal_comma():
+    text = 'Sample: a\nV;J\n0,0;-20,5\n0,1;-1,5e1\n'
+    header, names, data = read_table(text)
+
+    assert names == ['V', 'J']
+    assert data == pytest.approx(np.array([[0.0, -20.5], [0.1, -15.0]]))
+    # a comma delimiter stays a delimiter
+    assert read_table('V,J\n0,1\n')[2] == pytest.approx(np.array([[0.0, 1.0]]))